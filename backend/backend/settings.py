@@ -108,6 +108,24 @@ DATABASES = {
 }
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/#using-argon2-with-django
+# New passwords use Argon2id; PBKDF2 hashes from before the switch still verify
+# and are upgraded on the user's next login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Argon2id cost parameters (memory in KiB). 256 MiB over 2 lanes keeps GPU
+# cracking expensive; lower ARGON2_MEMORY_COST on small instances.
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', str(256 * 1024)))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '2'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -163,8 +181,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'core.parsers.OrjsonParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
@@ -236,11 +258,33 @@ else:
 CSRF_USE_SESSIONS = False  # Use cookie-based CSRF tokens
 SESSION_SAVE_EVERY_REQUEST = True  # Ensure session is saved on every request
 
+# Cache configuration
+# Set REDIS_URL (e.g. redis://localhost:6379/0) to share the cache between
+# workers; otherwise each process uses its own in-memory cache.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sessions are read from the cache and written through to the database, so
+# session loads skip the DB on cache hits and survive cache restarts
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Django Allauth Configuration
 SITE_ID = 1
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'core.backends.ProfileModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user's role profiles together with the user.
+
+    Every API view reads request.user.doctor_profile / patient_profile /
+    admin_profile, so joining them when the session user is loaded saves a
+    query on each authenticated request. Login checks read them too, so
+    authenticate() joins them as well. Missing profiles are cached as absent,
+    so hasattr() checks stay query-free too.
+    """
+    profile_fields = ('doctor_profile', 'patient_profile', 'admin_profile')
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related(*self.profile_fields).get(
+                **{UserModel.USERNAME_FIELD: username}
+            )
+        except UserModel.DoesNotExist:
+            # Run the hasher once anyway so response time does not reveal
+            # whether the username exists (same as ModelBackend)
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related(*self.profile_fields).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,61 @@
+"""
+Google Sign-In ID token verification shared by the doctor and patient auth views.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt
+from google.auth.transport import requests as google_requests
+
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+# Google publishes new signing keys well before using them and serves the certs
+# with a multi-hour max-age, so an hour in the cache is safe. A token signed with
+# a key we have not seen yet forces a refresh anyway.
+GOOGLE_CERTS_CACHE_KEY = 'google_oauth2_certs'
+GOOGLE_CERTS_CACHE_TIMEOUT = 3600  # seconds
+
+# Reuses the HTTP session to Google across sign-ins
+_GOOGLE_HTTP_REQUEST = google_requests.Request()
+
+
+def _fetch_google_certs():
+    """Download Google's signing certificates and cache them"""
+    response = _GOOGLE_HTTP_REQUEST(GOOGLE_CERTS_URL, method='GET')
+    if response.status != 200:
+        raise google_exceptions.TransportError(f'Could not fetch certificates at {GOOGLE_CERTS_URL}')
+
+    certs = json.loads(response.data.decode('utf-8'))
+    cache.set(GOOGLE_CERTS_CACHE_KEY, certs, GOOGLE_CERTS_CACHE_TIMEOUT)
+    return certs
+
+
+def verify_google_id_token(token, clock_skew_in_seconds=10):
+    """
+    Same checks as google.oauth2.id_token.verify_oauth2_token (signature, expiry,
+    audience, issuer), but Google's certificates come from the cache instead of
+    being downloaded on every sign-in.
+
+    Raises ValueError for an invalid token and GoogleAuthError for a wrong issuer.
+    """
+    certs = cache.get(GOOGLE_CERTS_CACHE_KEY)
+    if certs is None or jwt.decode_header(token).get('kid') not in certs:
+        certs = _fetch_google_certs()
+
+    idinfo = jwt.decode(
+        token,
+        certs=certs,
+        audience=settings.GOOGLE_CLIENT_ID,
+        clock_skew_in_seconds=clock_skew_in_seconds,
+    )
+
+    if idinfo['iss'] not in GOOGLE_ISSUERS:
+        raise google_exceptions.GoogleAuthError(
+            f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}"
+        )
+
+    return idinfo
@@ -0,0 +1,21 @@
+"""
+Password hashers used by the auth endpoints.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with memory, time and thread costs taken from settings.
+
+    Django's defaults target generic hardware; the ARGON2_* settings let each
+    deployment size the hash for its own CPU and memory. Changing them makes
+    existing hashes report must_update(), so users are rehashed on their next
+    login.
+    """
+    # Keeps the 'argon2' algorithm name, so hashes stay interchangeable with
+    # Django's own Argon2PasswordHasher
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
@@ -0,0 +1,77 @@
+"""
+Times the Argon2 password hasher so ARGON2_* can be sized for the host.
+
+Run it on the production box:
+
+    python manage.py benchmark_password_hasher --target-ms 250
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+from core.hashers import TunedArgon2PasswordHasher
+
+
+BENCHMARK_PASSWORD = 'correct horse battery staple'
+
+
+def _time_check_password(hasher, rounds):
+    """Median milliseconds for one verify, the work done on every login"""
+    encoded = hasher.encode(BENCHMARK_PASSWORD, hasher.salt())
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.verify(BENCHMARK_PASSWORD, encoded)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the Argon2 password hasher and suggest ARGON2_TIME_COST for a target latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help='Target time for one password check (default: 250)')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Timed checks per configuration (default: 5)')
+        parser.add_argument('--max-time-cost', type=int, default=10,
+                            help='Highest ARGON2_TIME_COST to try (default: 10)')
+
+    def handle(self, *args, **options):
+        target_ms = options['target_ms']
+        rounds = options['rounds']
+
+        hasher = get_hasher()
+        self.stdout.write(
+            f'Current hasher {hasher.__class__.__name__}: '
+            f'{_time_check_password(hasher, rounds):.1f} ms per check'
+        )
+
+        # Memory and lanes stay as configured; only passes are swept, since
+        # memory is the expensive part for an attacker and the safest to keep.
+        self.stdout.write(
+            f'Sweeping time_cost with memory_cost={settings.ARGON2_MEMORY_COST} KiB, '
+            f'parallelism={settings.ARGON2_PARALLELISM}'
+        )
+        suggested = None
+        for time_cost in range(1, options['max_time_cost'] + 1):
+            candidate = TunedArgon2PasswordHasher()
+            candidate.time_cost = time_cost
+            elapsed_ms = _time_check_password(candidate, rounds)
+            self.stdout.write(f'  time_cost={time_cost}: {elapsed_ms:.1f} ms')
+            if elapsed_ms > target_ms:
+                break
+            suggested = time_cost
+
+        if suggested is None:
+            self.stdout.write(self.style.WARNING(
+                f'Even time_cost=1 exceeds {target_ms:g} ms; lower ARGON2_MEMORY_COST on this host.'
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Suggested ARGON2_TIME_COST={suggested} (largest within {target_ms:g} ms)'
+        ))
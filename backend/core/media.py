@@ -0,0 +1,28 @@
+"""
+Absolute URLs for uploaded files in API responses.
+"""
+
+
+def absolute_file_url(context, file):
+    """
+    Absolute URL of a stored file, or its plain URL when there is no request.
+
+    request.build_absolute_uri() re-parses the URL and re-encodes it for every
+    file; storage URLs are already encoded, so the scheme and host are worked
+    out once per serializer context and simply prepended.
+    """
+    if not file:
+        return None
+
+    url = file.url
+    request = context.get('request')
+    if request is None:
+        return url
+    if not url.startswith('/') or url.startswith('//'):
+        # Already absolute (remote storage) or relative: leave it to Django
+        return request.build_absolute_uri(url)
+
+    base = context.get('absolute_url_base')
+    if base is None:
+        base = context['absolute_url_base'] = f'{request.scheme}://{request.get_host()}'
+    return base + url
@@ -0,0 +1,25 @@
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class OrjsonParser(JSONParser):
+    """
+    JSONParser that parses with orjson.
+
+    Large request bodies such as edited intake form schemas parse several
+    times faster. orjson only reads UTF-8 and, like DRF's strict mode, rejects
+    NaN and Infinity; bodies declared in another charset go to the stock parser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,26 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    JSONRenderer that serializes with orjson.
+
+    Datetimes keep DRF's format (ISO 8601 with a trailing 'Z' for UTC) and any
+    type orjson does not know (Decimal, lazy translation strings, querysets...)
+    falls back to DRF's JSONEncoder. Indented output (e.g. ?indent= from the
+    browsable API) is left to the stock renderer.
+    """
+
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.options)
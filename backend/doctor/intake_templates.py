@@ -0,0 +1,175 @@
+"""
+Curated intake form templates for common doctor requests.
+
+Requests such as "standard diabetes intake" come up again and again; serving a
+reviewed template for them is instant and more consistent than a fresh Groq
+generation. Anything that does not closely match a template still goes to the AI.
+"""
+
+import re
+
+
+# Words that carry no meaning for template matching ("create a standard intake form for ...")
+_STOPWORDS = frozenset([
+    'a', 'an', 'and', 'the', 'for', 'of', 'to', 'with', 'on', 'in', 'my', 'this',
+    'please', 'create', 'generate', 'make', 'build', 'need', 'want', 'i',
+    'form', 'forms', 'intake', 'questionnaire', 'patient', 'patients',
+    'standard', 'basic', 'general', 'new', 'initial', 'visit', 'assessment',
+])
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Minimum Jaccard similarity between prompt keywords and a template's keywords
+MATCH_THRESHOLD = 0.8
+
+
+INTAKE_TEMPLATES = [
+    {
+        'key': 'diabetes',
+        'keywords': [
+            {'diabetes'},
+            {'diabetic'},
+            {'diabetes', 'follow', 'up'},
+            {'type', '2', 'diabetes'},
+        ],
+        'schema': {
+            'fields': [
+                {'id': 'diabetes_type', 'label': 'Type of diabetes', 'type': 'select', 'required': True,
+                 'options': ['Type 1', 'Type 2', 'Gestational', 'Prediabetes', 'Not sure'], 'category': 'medical'},
+                {'id': 'diagnosis_year', 'label': 'Year of diagnosis', 'type': 'number', 'required': False,
+                 'validation': {'min': 1900, 'max': 2100}, 'category': 'history'},
+                {'id': 'current_medications', 'label': 'Current diabetes medications (including insulin)',
+                 'type': 'textarea', 'required': True, 'category': 'medical'},
+                {'id': 'last_hba1c', 'label': 'Most recent HbA1c (%)', 'type': 'number', 'required': False,
+                 'validation': {'min': 3, 'max': 20}, 'category': 'medical'},
+                {'id': 'glucose_monitoring', 'label': 'How often do you check your blood sugar?', 'type': 'select',
+                 'required': True, 'options': ['Several times a day', 'Daily', 'Weekly', 'Rarely', 'Never'],
+                 'category': 'lifestyle'},
+                {'id': 'hypoglycemia_episodes', 'label': 'Low blood sugar episodes in the last 3 months',
+                 'type': 'select', 'required': True, 'options': ['None', '1-2', '3-5', 'More than 5'],
+                 'category': 'medical'},
+                {'id': 'symptoms', 'label': 'Are you experiencing any of these symptoms?', 'type': 'multiselect',
+                 'required': False,
+                 'options': ['Excessive thirst', 'Frequent urination', 'Blurred vision', 'Numbness or tingling in feet',
+                             'Slow-healing wounds', 'Fatigue'],
+                 'category': 'medical'},
+                {'id': 'diet', 'label': 'Describe your typical daily diet', 'type': 'textarea', 'required': False,
+                 'category': 'lifestyle'},
+                {'id': 'exercise_frequency', 'label': 'How many days per week do you exercise?', 'type': 'number',
+                 'required': False, 'validation': {'min': 0, 'max': 7}, 'category': 'lifestyle'},
+                {'id': 'family_history', 'label': 'Family history of diabetes', 'type': 'textarea', 'required': False,
+                 'category': 'history'},
+            ],
+            'report_uploads': [
+                {'id': 'hba1c_report', 'label': 'Latest HbA1c report',
+                 'description': 'Upload your most recent HbA1c lab result', 'required': False,
+                 'upload_type': 'lab_result'},
+                {'id': 'glucose_log', 'label': 'Blood glucose log',
+                 'description': 'Readings from your glucometer or CGM for the last 2 weeks', 'required': False,
+                 'upload_type': 'document'},
+            ],
+        },
+    },
+    {
+        'key': 'pre_op_cardiac',
+        'keywords': [
+            {'pre', 'op', 'cardiac'},
+            {'preop', 'cardiac'},
+            {'pre', 'operative', 'cardiac'},
+            {'cardiac', 'pre', 'surgery'},
+            {'pre', 'op', 'cardiac', 'evaluation'},
+        ],
+        'schema': {
+            'fields': [
+                {'id': 'planned_procedure', 'label': 'Planned surgery or procedure', 'type': 'text', 'required': True,
+                 'category': 'medical'},
+                {'id': 'procedure_date', 'label': 'Scheduled date of procedure', 'type': 'date', 'required': False,
+                 'category': 'medical'},
+                {'id': 'cardiac_history', 'label': 'Do you have any of these heart conditions?', 'type': 'multiselect',
+                 'required': True,
+                 'options': ['Coronary artery disease', 'Previous heart attack', 'Heart failure', 'Arrhythmia',
+                             'Valve disease', 'Pacemaker or ICD', 'None'],
+                 'category': 'history'},
+                {'id': 'chest_pain', 'label': 'Do you get chest pain or shortness of breath on exertion?',
+                 'type': 'select', 'required': True, 'options': ['No', 'Occasionally', 'Frequently', 'At rest'],
+                 'category': 'medical'},
+                {'id': 'functional_capacity', 'label': 'Can you climb two flights of stairs without stopping?',
+                 'type': 'select', 'required': True, 'options': ['Yes', 'No', 'Not sure'], 'category': 'lifestyle'},
+                {'id': 'anticoagulants', 'label': 'Blood thinners or antiplatelet medications you take',
+                 'type': 'textarea', 'required': True, 'category': 'medical'},
+                {'id': 'previous_anesthesia', 'label': 'Problems with anesthesia in previous surgeries',
+                 'type': 'textarea', 'required': False, 'category': 'history'},
+                {'id': 'smoking_status', 'label': 'Smoking status', 'type': 'select', 'required': True,
+                 'options': ['Never', 'Former', 'Current'], 'category': 'lifestyle'},
+            ],
+            'report_uploads': [
+                {'id': 'ecg', 'label': 'Recent ECG', 'description': 'ECG taken within the last 6 months',
+                 'required': False, 'upload_type': 'medical_report'},
+                {'id': 'echocardiogram', 'label': 'Echocardiogram report',
+                 'description': 'Most recent echocardiogram, if available', 'required': False,
+                 'upload_type': 'imaging'},
+            ],
+        },
+    },
+    {
+        'key': 'hypertension',
+        'keywords': [
+            {'hypertension'},
+            {'blood', 'pressure'},
+            {'high', 'blood', 'pressure'},
+            {'hypertension', 'follow', 'up'},
+        ],
+        'schema': {
+            'fields': [
+                {'id': 'home_bp_readings', 'label': 'Recent home blood pressure readings', 'type': 'textarea',
+                 'required': True, 'placeholder': 'e.g. 130/85 on 01/05', 'category': 'medical'},
+                {'id': 'bp_medications', 'label': 'Blood pressure medications and doses', 'type': 'textarea',
+                 'required': True, 'category': 'medical'},
+                {'id': 'missed_doses', 'label': 'How often do you miss a dose?', 'type': 'select', 'required': True,
+                 'options': ['Never', 'Once a month', 'Once a week', 'More often'], 'category': 'medical'},
+                {'id': 'symptoms', 'label': 'Are you experiencing any of these symptoms?', 'type': 'multiselect',
+                 'required': False,
+                 'options': ['Headaches', 'Dizziness', 'Chest pain', 'Shortness of breath', 'Swelling in legs',
+                             'Vision changes'],
+                 'category': 'medical'},
+                {'id': 'salt_intake', 'label': 'How would you describe your salt intake?', 'type': 'select',
+                 'required': False, 'options': ['Low', 'Moderate', 'High', 'Not sure'], 'category': 'lifestyle'},
+                {'id': 'alcohol_use', 'label': 'Alcoholic drinks per week', 'type': 'number', 'required': False,
+                 'validation': {'min': 0, 'max': 100}, 'category': 'lifestyle'},
+                {'id': 'family_history', 'label': 'Family history of hypertension, stroke or heart disease',
+                 'type': 'textarea', 'required': False, 'category': 'history'},
+            ],
+            'report_uploads': [
+                {'id': 'bp_log', 'label': 'Blood pressure log',
+                 'description': 'Home blood pressure readings for the last 2 weeks', 'required': False,
+                 'upload_type': 'document'},
+            ],
+        },
+    },
+]
+
+
+def _keywords(text):
+    """Lower-cased content words of a prompt"""
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def match_intake_template(doctor_prompt):
+    """
+    Return the best matching curated template, or None if the prompt needs the AI
+    """
+    prompt_keywords = _keywords(doctor_prompt)
+    if not prompt_keywords:
+        return None
+
+    best_template = None
+    best_score = 0.0
+    for template in INTAKE_TEMPLATES:
+        for keywords in template['keywords']:
+            score = len(prompt_keywords & keywords) / len(prompt_keywords | keywords)
+            if score > best_score:
+                best_template, best_score = template, score
+
+    if best_score >= MATCH_THRESHOLD:
+        return best_template
+    return None
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:09
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Trim
+
+
+def populate_full_name(apps, schema_editor):
+    DoctorProfile = apps.get_model('doctor', 'DoctorProfile')
+    User = apps.get_model('auth', 'User')
+    DoctorProfile.objects.update(full_name=Trim(Concat('first_name', Value(' '), 'last_name')))
+    DoctorProfile.objects.filter(full_name='').update(
+        full_name=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('username')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('doctor', '0002_alter_doctorprofile_options_doctorprofile_city_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctorprofile',
+            name='full_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='First + last name (or username), kept in sync on save', max_length=201),
+        ),
+        migrations.RunPython(populate_full_name, migrations.RunPython.noop),
+    ]
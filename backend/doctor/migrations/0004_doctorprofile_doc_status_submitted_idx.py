@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0003_doctorprofile_full_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctorprofile',
+            index=models.Index(fields=['profile_status', '-submitted_at'], name='doc_status_submitted_idx'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-import datetime
+from django.utils import timezone
+import time
 
 
 class DoctorProfile(models.Model):
@@ -31,6 +33,8 @@ class DoctorProfile(models.Model):
     # Step 1 - Basic Professional Info
     first_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100, blank=True)
+    full_name = models.CharField(max_length=201, blank=True, db_index=True, editable=False,
+                                 help_text="First + last name (or username), kept in sync on save")
     display_name = models.CharField(max_length=150, blank=True, help_text="e.g., Dr. John Smith")
     specialization = models.CharField(max_length=200, blank=True)
     primary_clinic_hospital = models.CharField(max_length=200, blank=True)
@@ -67,22 +71,34 @@ class DoctorProfile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     submitted_at = models.DateTimeField(null=True, blank=True, help_text="When profile was submitted for verification")
     
+    # Fields a doctor may set through "save draft" (no IDs, status, files or admin fields)
+    DRAFT_FIELDS = frozenset([
+        'first_name', 'last_name', 'display_name', 'specialization',
+        'primary_clinic_hospital', 'city', 'country', 'license_number',
+        'phone_number', 'professional_email', 'bio', 'consultation_mode',
+        'years_of_experience', 'hospital_affiliation',
+    ])
+    
     class Meta:
         verbose_name = "Doctor Profile"
         verbose_name_plural = "Doctor Profiles"
         ordering = ['-created_at']
+        indexes = [
+            # Admin verification queue: pending profiles, most recently submitted first
+            models.Index(fields=['profile_status', '-submitted_at'], name='doc_status_submitted_idx'),
+        ]
     
     def __str__(self):
         return f"{self.display_name or self.full_name} - {self.doctor_id or 'No ID'}"
     
-    @property
-    def full_name(self):
+    def compose_full_name(self):
+        """First + last name, falling back to the username"""
         return f"{self.first_name} {self.last_name}".strip() or self.user.username
     
     def generate_doctor_id(self):
         """Generate unique doctor ID in format DR-YYYY-XXXXX"""
         if not self.doctor_id:
-            year = datetime.datetime.now().year
+            year = timezone.now().year
             # Get the last doctor ID created this year
             last_doctor = DoctorProfile.objects.filter(
                 doctor_id__startswith=f'DR-{year}-'
@@ -97,41 +113,65 @@ class DoctorProfile(models.Model):
             self.doctor_id = f'DR-{year}-{new_number:05d}'
         return self.doctor_id
     
-    def save(self, *args, **kwargs):
-        # Auto-generate doctor ID if not present
-        if not self.doctor_id:
-            self.generate_doctor_id()
+    def derived_values(self):
+        """
+        Columns computed from the other fields: save() writes them, and so must any
+        queryset update() that changes names or emails (see profile_save_draft)
+        """
+        values = {
+            # Keep the stored full name in sync with the name fields
+            'full_name': self.compose_full_name(),
+            'display_name': self.display_name,
+            'professional_email': self.professional_email,
+        }
         
         # Auto-generate display name if not set
         if not self.display_name and self.first_name and self.last_name:
-            self.display_name = f"Dr. {self.first_name} {self.last_name}"
+            values['display_name'] = f"Dr. {self.first_name} {self.last_name}"
         
         # Set professional email from user email if not set
         if not self.professional_email and self.user:
-            self.professional_email = self.user.email
+            values['professional_email'] = self.user.email
+        
+        return values
+    
+    def save(self, *args, **kwargs):
+        derived = self.derived_values()
+        for key, value in derived.items():
+            setattr(self, key, value)
+        derived_fields = list(derived)
+        
+        # Auto-generate doctor ID if not present
+        if not self.doctor_id:
+            self.generate_doctor_id()
+            derived_fields.append('doctor_id')
+        
+        # A partial save must also write the columns derived above
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *derived_fields}
         
         super().save(*args, **kwargs)
     
     def submit_for_verification(self):
         """Submit profile for admin verification"""
         self.profile_status = 'pending'
-        self.submitted_at = datetime.datetime.now()
-        self.save()
+        self.submitted_at = timezone.now()
+        self.save(update_fields=['profile_status', 'submitted_at', 'updated_at'])
     
     def verify_profile(self, admin_user):
         """Admin verifies the doctor profile"""
         self.profile_status = 'verified'
         self.verified_by = admin_user
-        self.verified_at = datetime.datetime.now()
+        self.verified_at = timezone.now()
         self.profile_completed = True
-        self.save()
+        self.save(update_fields=['profile_status', 'verified_by', 'verified_at', 'profile_completed', 'updated_at'])
     
     def reject_profile(self, admin_user, reason):
         """Admin rejects the doctor profile"""
         self.profile_status = 'rejected'
         self.rejection_reason = reason
         self.verified_by = admin_user
-        self.save()
+        self.save(update_fields=['profile_status', 'rejection_reason', 'verified_by', 'updated_at'])
     
     @property
     def is_verified(self):
@@ -147,8 +187,22 @@ class DoctorProfile(models.Model):
         return self.profile_status == 'verified' and self.profile_completed
 
 
-@receiver(post_save, sender=User)
-def create_doctor_profile(sender, instance, created, **kwargs):
-    """Create doctor profile when a user is created (if they're a doctor)"""
-    # This will be handled manually in the signup view
-    pass
+# Cached doctor listings (e.g. the admin pending list) include this version in their key;
+# it changes whenever any doctor profile is saved or deleted
+DOCTOR_LISTINGS_VERSION_KEY = 'doctor_listings_version'
+
+
+def doctor_listings_version():
+    """Current version of the cached doctor listings"""
+    return cache.get_or_set(DOCTOR_LISTINGS_VERSION_KEY, time.time_ns, None)
+
+
+def invalidate_doctor_listings():
+    """Start a new version so cached doctor listings are rebuilt"""
+    cache.set(DOCTOR_LISTINGS_VERSION_KEY, time.time_ns(), None)
+
+
+@receiver([post_save, post_delete], sender=DoctorProfile)
+def doctor_profile_changed(sender, **kwargs):
+    """Invalidate cached doctor listings when a profile changes"""
+    invalidate_doctor_listings()
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.utils.crypto import constant_time_compare
+from django.utils import timezone
+from core.media import absolute_file_url
 from .models import DoctorProfile
 
 
@@ -16,7 +19,7 @@ class DoctorSignupSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'password_confirm')
     
     def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
+        if not constant_time_compare(attrs['password'], attrs['password_confirm']):
             raise serializers.ValidationError({"password": "Passwords don't match."})
         return attrs
     
@@ -111,10 +114,8 @@ class DoctorProfileSerializer(serializers.ModelSerializer):
         )
     
     def get_license_document_url(self, obj):
-        if obj.license_document:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.license_document.url)
+        if obj.license_document and self.context.get('request'):
+            return absolute_file_url(self.context, obj.license_document)
         return None
 
 
@@ -130,7 +131,6 @@ class DoctorProfileStep0Serializer(serializers.ModelSerializer):
         return value
     
     def update(self, instance, validated_data):
-        from django.utils import timezone
         if validated_data.get('consent_given'):
             instance.consent_timestamp = timezone.now()
             instance.current_step = 1
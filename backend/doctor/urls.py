@@ -16,6 +16,7 @@ urlpatterns = [
     path('me/', views.doctor_current_user, name='doctor-current-user'),
     
     # 4-Step Profile Setup endpoints
+    path('profile/step/', views.profile_step, name='profile-step'),
     path('profile/step0/consent/', views.profile_step0_consent, name='profile-step0-consent'),
     path('profile/step1/basic-info/', views.profile_step1_basic_info, name='profile-step1-basic'),
     path('profile/step2/credentials/', views.profile_step2_credentials, name='profile-step2-credentials'),
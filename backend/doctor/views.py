@@ -2,11 +2,17 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
-from django.contrib.auth import authenticate, login
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied
+from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.conf import settings
 from django.utils import timezone
-from .models import DoctorProfile
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, OuterRef, Q, Subquery
+from core.google_auth import verify_google_id_token
+from .models import DoctorProfile, invalidate_doctor_listings
 from .serializers import (
     DoctorSignupSerializer,
     DoctorLoginSerializer,
@@ -20,6 +26,7 @@ from .serializers import (
     UserSerializer
 )
 from patient.models import (
+    PatientProfile,
     PatientDoctorConnection,
     ConnectionToken,
     DoctorPatientWorkspace,
@@ -31,13 +38,45 @@ from patient.serializers import (
     DoctorPatientWorkspaceUpdateSerializer,
     DoctorPatientTimelineEntrySerializer,
     DoctorPatientTimelineEntryCreateSerializer,
+    PatientProfileForDoctorSerializer,
 )
 from datetime import timedelta
-import qrcode
+import logging
+import segno
 from io import BytesIO
 import base64
 
 
+logger = logging.getLogger(__name__)
+
+
+DOCTOR_PROFILE_CACHE_TIMEOUT = 300  # seconds
+
+
+def _cached_doctor_profile_data(profile, request=None):
+    """
+    DoctorProfileSerializer data for profile, cached until the profile is saved again
+    (updated_at is part of the key). The request only affects absolute file URLs.
+    All doctor views return the profile through this helper, so each profile
+    version is serialized once and shared by step, auth and polling responses.
+    
+    username and email come from the User row, which can change without touching
+    the profile, so they are left out of the cached part and read on every call.
+    """
+    origin = f'{request.scheme}://{request.get_host()}' if request else ''
+    cache_key = f'doc_profile_json:{profile.pk}:{profile.updated_at.timestamp()}:{origin}'
+    data = cache.get(cache_key)
+    if data is None:
+        context = {'request': request} if request else {}
+        data = dict(DoctorProfileSerializer(profile, context=context).data)
+        del data['username'], data['email']
+        cache.set(cache_key, data, DOCTOR_PROFILE_CACHE_TIMEOUT)
+    
+    user = profile.user
+    # Same key order as the serializer (id, username, email, ...)
+    return {'id': data['id'], 'username': user.username, 'email': user.email, **data}
+
+
 @ensure_csrf_cookie
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -48,7 +87,6 @@ def doctor_signup(request):
         user = serializer.save()
         
         # Authenticate the user to set the backend attribute
-        from django.contrib.auth import authenticate
         authenticated_user = authenticate(
             request,
             username=user.username,
@@ -65,7 +103,7 @@ def doctor_signup(request):
             return Response({
                 'message': 'Doctor account created successfully',
                 'user': UserSerializer(authenticated_user).data,
-                'profile': DoctorProfileSerializer(doctor_profile).data,
+                'profile': _cached_doctor_profile_data(doctor_profile, request),
                 'profile_completed': doctor_profile.profile_completed,
                 'redirect_to': 'profile' if not doctor_profile.profile_completed else 'dashboard'
             }, status=status.HTTP_201_CREATED)
@@ -85,7 +123,6 @@ def doctor_login(request):
         user = serializer.validated_data['user']
         
         # Authenticate again to ensure backend attribute is set
-        from django.contrib.auth import authenticate
         authenticated_user = authenticate(
             request,
             username=request.data.get('username'),
@@ -110,7 +147,7 @@ def doctor_login(request):
             return Response({
                 'message': 'Login successful',
                 'user': UserSerializer(authenticated_user).data,
-                'profile': DoctorProfileSerializer(doctor_profile).data,
+                'profile': _cached_doctor_profile_data(doctor_profile, request),
                 'profile_completed': doctor_profile.profile_completed,
                 'profile_status': doctor_profile.profile_status,
                 'redirect_to': redirect_to
@@ -126,7 +163,6 @@ def doctor_login(request):
 @permission_classes([permissions.IsAuthenticated])
 def doctor_logout(request):
     """Doctor logout endpoint"""
-    from django.contrib.auth import logout
     logout(request)
     return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
 
@@ -137,18 +173,14 @@ class DoctorProfileView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        print(f"[PROFILE VIEW] User: {self.request.user}, Authenticated: {self.request.user.is_authenticated}")
-        print(f"[PROFILE VIEW] Session key: {self.request.session.session_key}")
-        print(f"[PROFILE VIEW] Session data: {dict(self.request.session)}")
-        print(f"[PROFILE VIEW] Cookies: {self.request.COOKIES}")
+        logger.debug("[PROFILE VIEW] User: %s, Authenticated: %s",
+                     self.request.user, self.request.user.is_authenticated)
         if not self.request.user.is_authenticated:
-            from rest_framework.exceptions import NotAuthenticated
             raise NotAuthenticated('You must be logged in to access this endpoint')
         
         try:
             return self.request.user.doctor_profile
         except DoctorProfile.DoesNotExist:
-            from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You must be logged in as a doctor to access this endpoint')
 
 
@@ -168,10 +200,9 @@ class DoctorProfileUpdateView(generics.UpdateAPIView):
         self.perform_update(serializer)
         
         # Return updated profile
-        updated_profile = DoctorProfileSerializer(instance)
         return Response({
             'message': 'Profile updated successfully',
-            'profile': updated_profile.data,
+            'profile': _cached_doctor_profile_data(instance, request),
             'profile_completed': instance.profile_completed,
             'redirect_to': 'dashboard' if instance.profile_completed else 'profile'
         }, status=status.HTTP_200_OK)
@@ -186,7 +217,7 @@ def doctor_current_user(request):
     
     return Response({
         'user': UserSerializer(user).data,
-        'profile': DoctorProfileSerializer(doctor_profile).data,
+        'profile': _cached_doctor_profile_data(doctor_profile, request),
         'profile_completed': doctor_profile.profile_completed
     }, status=status.HTTP_200_OK)
 
@@ -196,29 +227,17 @@ def doctor_current_user(request):
 @permission_classes([permissions.AllowAny])
 def doctor_google_auth(request):
     """Doctor Google OAuth authentication"""
-    from google.oauth2 import id_token
-    from google.auth.transport import requests as google_requests
-    from django.conf import settings
-    
     token = request.data.get('credential')
     
     if not token:
         return Response({'error': 'No credential provided'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Get Google Client ID from settings
-        google_client_id = settings.GOOGLE_CLIENT_ID
-        
-        # Verify the token with Google (with clock skew tolerance)
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            google_requests.Request(),
-            google_client_id,  # Verify with your actual client ID
-            clock_skew_in_seconds=10  # Allow 10 seconds clock skew tolerance
-        )
+        # Verify the token against Google's (cached) certificates, with clock skew tolerance
+        idinfo = verify_google_id_token(token, clock_skew_in_seconds=10)
         
         # Verify the token is for our client ID
-        if idinfo['aud'] != google_client_id:
+        if idinfo['aud'] != settings.GOOGLE_CLIENT_ID:
             return Response({'error': 'Invalid token audience'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Get user info from Google
@@ -230,8 +249,8 @@ def doctor_google_auth(request):
         if not email:
             return Response({'error': 'Email not provided by Google'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if user exists
-        user = User.objects.filter(email=email).first()
+        # Check if user exists (loading any doctor profile in the same query)
+        user = User.objects.filter(email=email).select_related('doctor_profile').first()
         
         if user:
             # Check if user has doctor profile
@@ -245,32 +264,30 @@ def doctor_google_auth(request):
                     last_name=last_name
                 )
         else:
-            # Create new user
+            # Create new user and doctor profile together; the password is made
+            # unusable before the first save so the user is written only once
             username = email.split('@')[0] + '_' + google_id[:8]
-            user = User.objects.create_user(
-                username=username,
-                email=email,
-                first_name=first_name,
-                last_name=last_name
-            )
-            user.set_unusable_password()  # No password for OAuth users
-            user.save()
-            
-            # Create doctor profile
-            doctor_profile = DoctorProfile.objects.create(
-                user=user,
-                first_name=first_name,
-                last_name=last_name
-            )
+            with transaction.atomic():
+                user = User(
+                    username=username,
+                    email=User.objects.normalize_email(email),
+                    first_name=first_name,
+                    last_name=last_name
+                )
+                user.set_unusable_password()  # No password for OAuth users
+                user.save()
+                
+                doctor_profile = DoctorProfile(
+                    user=user,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+                doctor_profile.save()
         
         # Log the user in
-        login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        login(request, user, backend='core.backends.ProfileModelBackend')
         
-        # Debug: Check session
-        print(f"[GOOGLE AUTH] User logged in: {user.username}")
-        print(f"[GOOGLE AUTH] Session key: {request.session.session_key}")
-        print(f"[GOOGLE AUTH] Session data: {dict(request.session)}")
-        print(f"[GOOGLE AUTH] User authenticated: {request.user.is_authenticated}")
+        logger.debug("[GOOGLE AUTH] User logged in: %s", user.username)
         
         # Determine redirect based on profile status
         if doctor_profile.profile_status == 'pending':
@@ -283,7 +300,7 @@ def doctor_google_auth(request):
         return Response({
             'message': 'Google authentication successful',
             'user': UserSerializer(user).data,
-            'profile': DoctorProfileSerializer(doctor_profile, context={'request': request}).data,
+            'profile': _cached_doctor_profile_data(doctor_profile, request),
             'profile_completed': doctor_profile.profile_completed,
             'profile_status': doctor_profile.profile_status,
             'redirect_to': redirect_to
@@ -297,6 +314,57 @@ def doctor_google_auth(request):
 
 # ==================== 4-STEP PROFILE SETUP ====================
 
+# step -> (serializer, precondition on the profile, error when it is not met, success message)
+PROFILE_STEPS = {
+    0: (DoctorProfileStep0Serializer, None, None, 'Consent recorded successfully'),
+    1: (DoctorProfileStep1Serializer, lambda profile: profile.consent_given,
+        'Consent must be given before proceeding', 'Basic info saved successfully'),
+    2: (DoctorProfileStep2Serializer, lambda profile: profile.current_step >= 1,
+        'Complete previous steps first', 'Credentials saved successfully'),
+    3: (DoctorProfileStep3Serializer, lambda profile: profile.current_step >= 2,
+        'Complete previous steps first', 'Contact info saved successfully'),
+}
+
+
+def _save_profile_step(request, profile, step):
+    """Validate and save one setup step for profile (shared by all step endpoints)"""
+    serializer_class, is_ready, not_ready_error, message = PROFILE_STEPS[step]
+    
+    if is_ready and not is_ready(profile):
+        return Response({'error': not_ready_error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = serializer_class(profile, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        response_data = {'message': message}
+        if step == 2:
+            response_data['doctor_id'] = profile.doctor_id
+        response_data['profile'] = _cached_doctor_profile_data(profile, request)
+        return Response(response_data, status=status.HTTP_200_OK)
+    
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser, JSONParser])
+def profile_step(request):
+    """Save any setup step (0-3), chosen by the 'step' field of the payload"""
+    try:
+        profile = request.user.doctor_profile
+    except DoctorProfile.DoesNotExist:
+        return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        step = int(request.data.get('step'))
+    except (TypeError, ValueError):
+        step = None
+    if step not in PROFILE_STEPS:
+        return Response({'error': 'step must be one of 0, 1, 2 or 3'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return _save_profile_step(request, profile, step)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def profile_step0_consent(request):
@@ -309,15 +377,7 @@ def profile_step0_consent(request):
             'detail': 'Doctor profile not found for current user'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    serializer = DoctorProfileStep0Serializer(profile, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({
-            'message': 'Consent recorded successfully',
-            'profile': DoctorProfileSerializer(profile, context={'request': request}).data
-        }, status=status.HTTP_200_OK)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return _save_profile_step(request, profile, 0)
 
 
 @api_view(['POST'])
@@ -329,18 +389,7 @@ def profile_step1_basic_info(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    if not profile.consent_given:
-        return Response({'error': 'Consent must be given before proceeding'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    serializer = DoctorProfileStep1Serializer(profile, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({
-            'message': 'Basic info saved successfully',
-            'profile': DoctorProfileSerializer(profile, context={'request': request}).data
-        }, status=status.HTTP_200_OK)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return _save_profile_step(request, profile, 1)
 
 
 @api_view(['POST'])
@@ -353,19 +402,7 @@ def profile_step2_credentials(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    if profile.current_step < 1:
-        return Response({'error': 'Complete previous steps first'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    serializer = DoctorProfileStep2Serializer(profile, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({
-            'message': 'Credentials saved successfully',
-            'doctor_id': profile.doctor_id,
-            'profile': DoctorProfileSerializer(profile, context={'request': request}).data
-        }, status=status.HTTP_200_OK)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return _save_profile_step(request, profile, 2)
 
 
 @api_view(['POST'])
@@ -377,18 +414,7 @@ def profile_step3_contact(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    if profile.current_step < 2:
-        return Response({'error': 'Complete previous steps first'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    serializer = DoctorProfileStep3Serializer(profile, data=request.data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return Response({
-            'message': 'Contact info saved successfully',
-            'profile': DoctorProfileSerializer(profile, context={'request': request}).data
-        }, status=status.HTTP_200_OK)
-    
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return _save_profile_step(request, profile, 3)
 
 
 @api_view(['POST'])
@@ -409,7 +435,7 @@ def profile_submit_verification(request):
         
         return Response({
             'message': 'Profile submitted for verification successfully',
-            'profile': DoctorProfileSerializer(profile, context={'request': request}).data,
+            'profile': _cached_doctor_profile_data(profile, request),
             'redirect_to': 'verification_pending'
         }, status=status.HTTP_200_OK)
     
@@ -425,16 +451,23 @@ def profile_save_draft(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Save current data without validation
-    for key, value in request.data.items():
-        if hasattr(profile, key) and key not in ['id', 'user', 'doctor_id', 'profile_status']:
+    # Save current data without validation, writing only the submitted draft fields
+    updates = {key: value for key, value in request.data.items() if key in DoctorProfile.DRAFT_FIELDS}
+    if updates:
+        for key, value in updates.items():
             setattr(profile, key, value)
-    
-    profile.save()
+        # update() skips save(), so also write the columns save() derives
+        derived = profile.derived_values()
+        derived['updated_at'] = timezone.now()
+        for key, value in derived.items():
+            setattr(profile, key, value)
+        updates.update(derived)
+        DoctorProfile.objects.filter(pk=profile.pk).update(**updates)
+        invalidate_doctor_listings()  # update() skips the post_save receiver
     
     return Response({
         'message': 'Draft saved successfully',
-        'profile': DoctorProfileSerializer(profile, context={'request': request}).data
+        'profile': _cached_doctor_profile_data(profile, request)
     }, status=status.HTTP_200_OK)
 
 
@@ -455,7 +488,7 @@ def profile_verification_status(request):
         'rejection_reason': profile.rejection_reason if profile.profile_status == 'rejected' else None,
         'verified_at': profile.verified_at,
         'submitted_at': profile.submitted_at,
-        'profile': DoctorProfileSerializer(profile, context={'request': request}).data
+        'profile': _cached_doctor_profile_data(profile, request)
     }, status=status.HTTP_200_OK)
 
 
@@ -474,7 +507,11 @@ def get_connection_requests(request):
     pending_connections = PatientDoctorConnection.objects.filter(
         doctor=doctor_profile,
         status='pending'
-    ).select_related('patient', 'patient__user').order_by('-created_at')
+    ).select_related('patient').only(
+        'id', 'patient_note', 'connection_type', 'created_at',
+        'patient__full_name', 'patient__date_of_birth',
+        'patient__gender', 'patient__emergency_contact_name',
+    ).order_by('-created_at')
     
     # Serialize connection data (hiding sensitive patient info)
     connections_data = []
@@ -496,6 +533,28 @@ def get_connection_requests(request):
     }, status=status.HTTP_200_OK)
 
 
+# (response key, queryset column) pairs returned by get_connected_patients
+CONNECTED_PATIENT_COLUMNS = (
+    ('connection_id', 'id'),
+    ('patient_id', 'patient__patient_id'),
+    ('patient_name', 'patient__full_name'),
+    ('patient_email', 'patient__user__email'),
+    ('patient_phone', 'patient__phone_number'),
+    ('date_of_birth', 'patient__date_of_birth'),
+    ('gender', 'patient__gender'),
+    ('blood_group', 'patient__blood_group'),
+    ('allergies', 'patient__known_allergies'),
+    ('chronic_conditions', 'patient__chronic_conditions'),
+    ('current_medications', 'patient__current_medications'),
+    ('emergency_contact_name', 'patient__emergency_contact_name'),
+    ('emergency_contact_phone', 'patient__emergency_contact_phone'),
+    ('preferred_language', 'patient__preferred_language'),
+    ('note_for_doctors', 'patient__note_for_doctors'),
+    ('connected_since', 'accepted_at'),
+    ('patient_note', 'patient_note'),
+)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_connected_patients(request):
@@ -505,34 +564,14 @@ def get_connected_patients(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get all accepted connections
+    # Get all accepted connections as plain rows
     connected_patients = PatientDoctorConnection.objects.filter(
         doctor=doctor_profile,
         status='accepted'
-    ).select_related('patient', 'patient__user').order_by('-accepted_at')
-    
-    # Serialize full patient data for accepted connections
-    patients_data = []
-    for conn in connected_patients:
-        patients_data.append({
-            'connection_id': conn.id,
-            'patient_id': conn.patient.patient_id,
-            'patient_name': conn.patient.full_name,
-            'patient_email': conn.patient.user.email,
-            'patient_phone': conn.patient.phone_number,
-            'date_of_birth': conn.patient.date_of_birth,
-            'gender': conn.patient.gender,
-            'blood_group': conn.patient.blood_group,
-            'allergies': conn.patient.known_allergies,
-            'chronic_conditions': conn.patient.chronic_conditions,
-            'current_medications': conn.patient.current_medications,
-            'emergency_contact_name': conn.patient.emergency_contact_name,
-            'emergency_contact_phone': conn.patient.emergency_contact_phone,
-            'preferred_language': conn.patient.preferred_language,
-            'note_for_doctors': conn.patient.note_for_doctors,
-            'connected_since': conn.accepted_at,
-            'patient_note': conn.patient_note,
-        })
+    ).order_by('-accepted_at')
+    
+    response_keys, columns = zip(*CONNECTED_PATIENT_COLUMNS)
+    patients_data = [dict(zip(response_keys, row)) for row in connected_patients.values_list(*columns)]
     
     return Response({
         'connected_patients': patients_data,
@@ -549,18 +588,20 @@ def accept_connection_request(request, connection_id):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    try:
-        connection = PatientDoctorConnection.objects.get(
-            id=connection_id,
-            doctor=doctor_profile,
-            status='pending'
-        )
-    except PatientDoctorConnection.DoesNotExist:
+    # Accept the connection with a single conditional UPDATE (only pending requests)
+    doctor_note = request.data.get('note', '')
+    now = timezone.now()
+    accepted = PatientDoctorConnection.objects.filter(
+        id=connection_id,
+        doctor=doctor_profile,
+        status='pending'
+    ).update(status='accepted', accepted_at=now, doctor_note=doctor_note, updated_at=now)
+    if not accepted:
         return Response({'error': 'Connection request not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Accept the connection
-    doctor_note = request.data.get('note', '')
-    connection.accept_connection(doctor_note)
+    connection = PatientDoctorConnection.objects.select_related('patient__user', 'doctor__user').get(id=connection_id)
+    # update() does not send post_save, so create the workspace explicitly
+    DoctorPatientWorkspace.ensure_for_connection(connection).sync_metadata()
     
     return Response({
         'message': 'Connection accepted successfully',
@@ -579,22 +620,19 @@ def reject_connection_request(request, connection_id):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    try:
-        connection = PatientDoctorConnection.objects.get(
-            id=connection_id,
-            doctor=doctor_profile,
-            status='pending'
-        )
-    except PatientDoctorConnection.DoesNotExist:
-        return Response({'error': 'Connection request not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Reject the connection
+    # Reject the connection with a single conditional UPDATE (only pending requests)
     doctor_note = request.data.get('note', '')
-    connection.reject_connection(doctor_note)
+    rejected = PatientDoctorConnection.objects.filter(
+        id=connection_id,
+        doctor=doctor_profile,
+        status='pending'
+    ).update(status='rejected', doctor_note=doctor_note, updated_at=timezone.now())
+    if not rejected:
+        return Response({'error': 'Connection request not found'}, status=status.HTTP_404_NOT_FOUND)
     
     return Response({
         'message': 'Connection rejected',
-        'connection_id': connection.id
+        'connection_id': connection_id
     }, status=status.HTTP_200_OK)
 
 
@@ -630,7 +668,7 @@ def remove_patient_connection(request, connection_id):
 def _get_workspace_for_doctor(doctor_profile, connection_id):
     """Helper to fetch workspace for a doctor/connection combo"""
     try:
-        connection = PatientDoctorConnection.objects.select_related('patient', 'doctor').get(
+        connection = PatientDoctorConnection.objects.select_related('patient__user', 'doctor').get(
             id=connection_id,
             doctor=doctor_profile,
             status='accepted'
@@ -660,10 +698,11 @@ def doctor_list_workspaces(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    # Only used to ensure workspaces exist, so skip the default ordering
     connections = PatientDoctorConnection.objects.filter(
         doctor=doctor_profile,
         status='accepted'
-    ).select_related('patient', 'doctor')
+    ).select_related('patient', 'doctor').order_by()
 
     if not connections.exists():
         return Response({'count': 0, 'workspaces': []}, status=status.HTTP_200_OK)
@@ -673,9 +712,11 @@ def doctor_list_workspaces(request):
         DoctorPatientWorkspace.ensure_for_connection(connection).sync_metadata()
         connection_ids.append(connection.id)
 
-    workspaces = DoctorPatientWorkspace.objects.filter(
+    workspaces = DoctorPatientWorkspace.objects.for_summary().filter(
         connection_id__in=connection_ids
-    ).select_related('patient', 'doctor', 'connection').prefetch_related('timeline_entries')
+    ).prefetch_related(
+        DoctorPatientWorkspaceSummarySerializer.patient_entries_prefetch()
+    )
 
     serializer = DoctorPatientWorkspaceSummarySerializer(workspaces, many=True)
     return Response({'count': len(serializer.data), 'workspaces': serializer.data}, status=status.HTTP_200_OK)
@@ -742,6 +783,23 @@ def doctor_workspace_add_entry(request, connection_id):
 
 # ==================== QR CODE GENERATION & MANAGEMENT ====================
 
+# Maximum QR tokens a doctor can generate per window
+QR_RATE_LIMIT = 10
+QR_RATE_WINDOW = 60  # seconds
+
+
+def _render_qr_code(qr_data):
+    """Render a QR code for qr_data as a base64 PNG data URI"""
+    # segno writes the PNG directly, without building a PIL image first
+    qr = segno.make(qr_data, error='m', micro=False)
+    
+    # Convert to base64
+    buffer = BytesIO()
+    qr.save(buffer, kind='png', scale=10, border=4, dark='black', light='white')
+    img_str = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/png;base64,{img_str}'
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def generate_qr_token(request):
@@ -757,6 +815,19 @@ def generate_qr_token(request):
             'error': 'Only verified doctors can generate connection QR codes'
         }, status=status.HTTP_403_FORBIDDEN)
     
+    # Per-doctor rate limit (fixed window counter in the cache)
+    rate_key = f'qr_rate:{doctor_profile.pk}'
+    cache.add(rate_key, 0, QR_RATE_WINDOW)
+    try:
+        generated_in_window = cache.incr(rate_key)
+    except ValueError:  # key expired between add() and incr()
+        cache.set(rate_key, 1, QR_RATE_WINDOW)
+        generated_in_window = 1
+    if generated_in_window > QR_RATE_LIMIT:
+        return Response({
+            'error': 'Too many QR codes generated. Please wait a minute and try again.'
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
     # Get expiry time from request (default 24 hours)
     expiry_hours = request.data.get('expiry_hours', 24)
     max_uses = request.data.get('max_uses', 1)
@@ -785,23 +856,10 @@ def generate_qr_token(request):
     frontend_url = request.data.get('frontend_url', 'http://localhost:5173')
     qr_data = f"{frontend_url}/patient/scan-qr/{token.token}"
     
-    # Generate QR code image
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    # Create image
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to base64
-    buffer = BytesIO()
-    img.save(buffer, format='PNG')
-    img_str = base64.b64encode(buffer.getvalue()).decode()
-    
     return Response({
         'message': 'QR code generated successfully',
         'token': token.token,
-        'qr_code_image': f'data:image/png;base64,{img_str}',
+        'qr_code_image': _render_qr_code(qr_data),
         'qr_url': qr_data,
         'expires_at': token.expires_at,
         'max_uses': token.max_uses,
@@ -810,6 +868,21 @@ def generate_qr_token(request):
     }, status=status.HTTP_201_CREATED)
 
 
+# (response key, queryset column) pairs returned by get_my_qr_tokens
+QR_TOKEN_COLUMNS = (
+    ('token', 'token'),
+    ('created_at', 'created_at'),
+    ('expires_at', 'expires_at'),
+    ('is_expired', 'is_expired_db'),
+    ('is_used', 'is_used'),
+    ('is_valid', 'is_valid_db'),
+    ('use_count', 'use_count'),
+    ('max_uses', 'max_uses'),
+    ('used_by', 'used_by_patient__full_name'),
+    ('used_at', 'used_at'),
+)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_my_qr_tokens(request):
@@ -819,25 +892,20 @@ def get_my_qr_tokens(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get all tokens
+    # Get all tokens; expiry/validity are computed in SQL
+    now = timezone.now()
     tokens = ConnectionToken.objects.filter(
         doctor=doctor_profile
+    ).annotate(
+        is_expired_db=ExpressionWrapper(Q(expires_at__lt=now), output_field=BooleanField()),
+        is_valid_db=ExpressionWrapper(
+            Q(expires_at__gte=now) & Q(use_count__lt=F('max_uses')),
+            output_field=BooleanField()
+        ),
     ).order_by('-created_at')
     
-    tokens_data = []
-    for token in tokens:
-        tokens_data.append({
-            'token': token.token,
-            'created_at': token.created_at,
-            'expires_at': token.expires_at,
-            'is_expired': token.is_expired,
-            'is_used': token.is_used,
-            'is_valid': token.is_valid,
-            'use_count': token.use_count,
-            'max_uses': token.max_uses,
-            'used_by': token.used_by_patient.full_name if token.used_by_patient else None,
-            'used_at': token.used_at
-        })
+    response_keys, columns = zip(*QR_TOKEN_COLUMNS)
+    tokens_data = [dict(zip(response_keys, row)) for row in tokens.values_list(*columns)]
     
     return Response({
         'tokens': tokens_data,
@@ -886,9 +954,6 @@ def search_patients(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    from patient.models import PatientProfile
-    from django.db.models import Q
-    
     query = request.GET.get('q', '').strip()
     patient_id = request.GET.get('patient_id', '').strip()
     
@@ -904,36 +969,28 @@ def search_patients(request):
         # Search by patient ID (exact match)
         patients = patients.filter(patient_id=patient_id)
     elif query:
-        # Search by name
-        patients = patients.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query)
-        )
+        # Search by name (one LIKE on the stored full name; completed profiles always
+        # have both names set, so this also matches "first last" queries)
+        patients = patients.filter(full_name__icontains=query)
     
-    # Get existing connections to check status
-    existing_connections = PatientDoctorConnection.objects.filter(
+    # Status of this doctor's connection with each patient, joined into the same query
+    # (at most one row per patient/doctor pair, so the default ordering is dropped)
+    connection_status = PatientDoctorConnection.objects.filter(
         doctor=doctor_profile,
-        patient__in=patients
-    ).values('patient_id', 'status')
-    
-    connection_status_map = {conn['patient_id']: conn['status'] for conn in existing_connections}
-    
-    # Limit results
-    patients = patients[:20]
-    
-    patients_data = []
-    for patient in patients:
-        connection_status = connection_status_map.get(patient.id, None)
-        patients_data.append({
-            'id': patient.id,
-            'patient_id': patient.patient_id,
-            'full_name': patient.full_name,
-            'age': patient.date_of_birth.year if patient.date_of_birth else None,
-            'gender': patient.gender,
-            'blood_group': patient.blood_group,
-            'city': patient.city if hasattr(patient, 'city') else None,
-            'connection_status': connection_status  # None, 'pending', 'accepted', 'rejected'
-        })
+        patient=OuterRef('pk')
+    ).order_by().values('status')[:1]
+    
+    # Limit results, fetching the response columns as plain dicts
+    patients_data = list(patients.annotate(
+        connection_status=Subquery(connection_status)  # None, 'pending', 'accepted', 'rejected'
+    ).values(
+        'id', 'patient_id', 'full_name', 'date_of_birth', 'gender', 'blood_group', 'connection_status',
+    )[:20])
+    
+    for row in patients_data:
+        date_of_birth = row.pop('date_of_birth')
+        row['age'] = date_of_birth.year if date_of_birth else None
+        row['city'] = None  # Patient profiles have no city
     
     return Response({
         'count': len(patients_data),
@@ -950,8 +1007,6 @@ def create_patient_connection(request):
     except DoctorProfile.DoesNotExist:
         return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    from patient.models import PatientProfile
-    
     patient_id = request.data.get('patient_id')
     doctor_note = request.data.get('note', '')
     
@@ -963,27 +1018,27 @@ def create_patient_connection(request):
     except PatientProfile.DoesNotExist:
         return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Check if connection already exists
-    existing_connection = PatientDoctorConnection.objects.filter(
-        patient=patient_profile,
-        doctor=doctor_profile
-    ).first()
-    
-    if existing_connection:
+    # Create connection request from doctor; the (patient, doctor) unique constraint
+    # rejects duplicates, so the existing connection is only read when there is one
+    try:
+        with transaction.atomic():
+            connection = PatientDoctorConnection.objects.create(
+                patient=patient_profile,
+                doctor=doctor_profile,
+                doctor_note=doctor_note,
+                connection_type='request',
+                initiated_by='doctor',
+                status='pending'
+            )
+    except IntegrityError:
+        existing_status = PatientDoctorConnection.objects.filter(
+            patient=patient_profile,
+            doctor=doctor_profile
+        ).values_list('status', flat=True).first()
         return Response({
-            'error': f'Connection already exists with status: {existing_connection.status}'
+            'error': f'Connection already exists with status: {existing_status}'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Create connection request from doctor
-    connection = PatientDoctorConnection.objects.create(
-        patient=patient_profile,
-        doctor=doctor_profile,
-        doctor_note=doctor_note,
-        connection_type='request',
-        initiated_by='doctor',
-        status='pending'
-    )
-    
     return Response({
         'message': 'Connection request sent to patient successfully',
         'connection_id': connection.id,
@@ -1005,14 +1060,13 @@ def get_patient_profile_detail(request, patient_id):
     
     # Get patient profile
     try:
-        from patient.models import PatientProfile
         patient_profile = PatientProfile.objects.get(id=patient_id)
     except PatientProfile.DoesNotExist:
         return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
     
     # Check if doctor is connected to this patient
     try:
-        connection = PatientDoctorConnection.objects.get(
+        connection = PatientDoctorConnection.objects.select_related('workspace').get(
             patient=patient_profile,
             doctor=doctor_profile,
             status='accepted'
@@ -1022,11 +1076,14 @@ def get_patient_profile_detail(request, patient_id):
             'error': 'You are not connected to this patient'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Serialize patient profile with context
-    from patient.serializers import PatientProfileForDoctorSerializer
+    # Serialize patient profile with context; the connection map saves the
+    # serializer from looking the connection up again
     serializer = PatientProfileForDoctorSerializer(
         patient_profile,
-        context={'doctor_profile': doctor_profile}
+        context={
+            'doctor_profile': doctor_profile,
+            'connections': {patient_profile.id: connection},
+        }
     )
     
     return Response({
@@ -1065,8 +1122,6 @@ def doctor_dashboard_summary(request):
     ).select_related('patient', 'connection').count()
     
     # Get recent timeline entries (last 7 days)
-    from datetime import timedelta
-    from django.utils import timezone
     seven_days_ago = timezone.now() - timedelta(days=7)
     
     recent_updates = DoctorPatientTimelineEntry.objects.filter(
@@ -1098,7 +1153,7 @@ def doctor_dashboard_summary(request):
         workspace__doctor=doctor_profile,
         is_critical=True,
         created_at__gte=seven_days_ago
-    ).select_related('workspace__patient').order_by('-created_at')[:5]
+    ).select_related('workspace__patient').for_list().order_by('-created_at')[:5]
     
     critical_entries_data = []
     for entry in critical_entries:
@@ -1114,7 +1169,7 @@ def doctor_dashboard_summary(request):
     
     # Get QR tokens statistics
     qr_tokens = ConnectionToken.objects.filter(doctor=doctor_profile)
-    active_qr_tokens = qr_tokens.filter(is_valid=True).count()
+    active_qr_tokens = qr_tokens.valid().count()
     
     return Response({
         'summary': {
@@ -1140,19 +1195,31 @@ def doctor_dashboard_summary(request):
 # ===========================
 
 import os
+import re
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
 from patient.models import AIIntakeForm, IntakeFormResponse, IntakeFormUpload
+from patient.pagination import IntakeFormListPagination
+from .intake_templates import match_intake_template
 from patient.serializers import (
     AIIntakeFormSerializer,
     AIIntakeFormCreateSerializer,
     AIIntakeFormUpdateSerializer,
-    DoctorIntakeFormListSerializer,
     IntakeFormUploadSerializer,
 )
 
 
+# Shared HTTP session so Groq calls reuse keep-alive TLS connections.
+# Retries are handled in generate_intake_form_with_gemini, not by the adapter.
+_GROQ_SESSION = requests.Session()
+_GROQ_SESSION.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=16, pool_maxsize=64, max_retries=0
+))
+
+
 def generate_intake_form_with_gemini(doctor_prompt, patient_context=None):
     """
     Generate intake form schema using Groq API with retry logic and error handling
@@ -1167,11 +1234,15 @@ def generate_intake_form_with_gemini(doctor_prompt, patient_context=None):
         }
     
     # Groq API endpoint and model
+    # Short prompts go to the smaller, faster model with a tighter output cap;
+    # the 70B model is reserved for longer, more complex form specifications
     api_url = 'https://api.groq.com/openai/v1/chat/completions'
-    model_name = 'llama-3.3-70b-versatile'
+    prompt_words = len(doctor_prompt.split())
+    model_name = 'llama-3.1-8b-instant' if prompt_words < 60 else 'llama-3.3-70b-versatile'
+    max_tokens = min(2048, 512 + prompt_words * 8)
     
-    # Retry configuration
-    max_retries = 3
+    # Retry configuration (up to 30s of backoff between attempts)
+    max_retries = 5
     base_delay = 2
     
     last_error = None
@@ -1228,7 +1299,7 @@ Make fields relevant to the doctor's request. Use proper medical terminology but
 
             context_info = ""
             if patient_context:
-                context_info = f"\nPatient Context: {json.dumps(patient_context, indent=2)}\n"
+                context_info = f"\nPatient Context: {json.dumps(patient_context, separators=(',', ':'))}\n"
             
             user_prompt = f"""{context_info}
 Doctor's Request: {doctor_prompt}
@@ -1249,10 +1320,12 @@ Generate the intake form JSON now:"""
                 'model': model_name,
                 'stream': False,
                 'temperature': 0.7,
-                'max_tokens': 2048
+                'max_tokens': max_tokens,
+                # JSON mode guarantees a single JSON object (no markdown fences)
+                'response_format': {'type': 'json_object'}
             }
             
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+            response = _GROQ_SESSION.post(api_url, headers=headers, json=payload, timeout=30)
             
             # Check for errors
             if response.status_code != 200:
@@ -1263,17 +1336,13 @@ Generate the intake form JSON now:"""
             response_data = response.json()
             raw_response = response_data['choices'][0]['message']['content'].strip()
             
-            # Clean up the response - remove markdown code blocks if present
-            cleaned_response = raw_response
-            if '```json' in cleaned_response:
-                cleaned_response = cleaned_response.split('```json')[1].split('```')[0]
-            elif '```' in cleaned_response:
-                cleaned_response = cleaned_response.split('```')[1].split('```')[0]
-            
-            cleaned_response = cleaned_response.strip()
-            
-            # Parse JSON response
-            form_data = json.loads(cleaned_response)
+            # Parse JSON response - JSON mode makes a malformed body a hard
+            # failure rather than something worth another full LLM call
+            try:
+                form_data = json.loads(raw_response)
+            except json.JSONDecodeError as e:
+                last_error = f'Failed to parse AI response as JSON: {str(e)}'
+                break
             
             # Validate and ensure proper structure
             validated_schema = validate_form_schema(form_data)
@@ -1286,12 +1355,6 @@ Generate the intake form JSON now:"""
                 'model_used': model_name
             }
         
-        except json.JSONDecodeError as e:
-            last_error = f'Failed to parse AI response as JSON: {str(e)}'
-            if attempt < max_retries - 1:
-                time.sleep(base_delay * (2 ** attempt))
-                continue
-        
         except requests.exceptions.Timeout:
             last_error = 'Request timeout'
             if attempt < max_retries - 1:
@@ -1312,8 +1375,8 @@ Generate the intake form JSON now:"""
                     'details': last_error
                 }
             
-            # Retry on transient errors
-            if attempt < max_retries - 1 and any(keyword in error_message for keyword in ['timeout', 'connection', '503', '500']):
+            # Any other network error is treated as transient
+            if attempt < max_retries - 1:
                 time.sleep(base_delay * (2 ** attempt))
                 continue
         
@@ -1339,79 +1402,122 @@ Generate the intake form JSON now:"""
     # If all retries failed
     return {
         'success': False,
-        'error': f'Failed to generate form after {max_retries} attempts. Last error: {last_error}',
+        'error': f'Failed to generate form after {attempt + 1} attempt(s). Last error: {last_error}',
         'raw_response': raw_response,
         'quota_exceeded': False
     }
 
 
+_VALID_FIELD_TYPES = frozenset(['text', 'textarea', 'number', 'date', 'select', 'multiselect', 'file'])
+_ID_RE = re.compile(r'[^a-z0-9_]')
+
+
+def _id_from_label(label):
+    """Build a field/upload id from its label"""
+    return _ID_RE.sub('', label.lower().replace(' ', '_'))[:50]
+
+
 def validate_form_schema(schema):
-    """Validate and fix the form schema structure"""
-    import re
-    
+    """
+    Validate and fix the form schema structure
+    Builds the validated entries in a single pass without mutating the input
+    """
     validated = {
         'fields': [],
         'report_uploads': []
     }
+    if not isinstance(schema, dict):
+        return validated
     
     # Validate fields
-    if 'fields' in schema and isinstance(schema['fields'], list):
-        for field in schema['fields']:
-            if not isinstance(field, dict):
+    fields = schema.get('fields')
+    if isinstance(fields, list):
+        for field in fields:
+            if not isinstance(field, dict) or 'label' not in field or 'type' not in field:
                 continue
             
-            # Ensure required properties
-            if 'id' not in field or 'label' not in field or 'type' not in field:
-                if 'label' in field and 'id' not in field:
-                    # Generate ID from label
-                    field_id = re.sub(r'[^a-z0-9_]', '', field['label'].lower().replace(' ', '_'))
-                    field['id'] = field_id[:50]
-                else:
-                    continue
-            
-            # Set default values
-            field.setdefault('required', False)
-            field.setdefault('placeholder', '')
-            field.setdefault('helpText', '')
-            field.setdefault('category', 'medical')
-            
-            # Validate type
-            valid_types = ['text', 'textarea', 'number', 'date', 'select', 'multiselect', 'file']
-            if field['type'] not in valid_types:
-                field['type'] = 'text'
-            
-            validated['fields'].append(field)
+            validated['fields'].append({
+                'required': False,
+                'placeholder': '',
+                'helpText': '',
+                'category': 'medical',
+                **field,
+                'id': field['id'] if 'id' in field else _id_from_label(field['label']),
+                'type': field['type'] if field['type'] in _VALID_FIELD_TYPES else 'text',
+            })
     
     # Validate report uploads
-    if 'report_uploads' in schema and isinstance(schema['report_uploads'], list):
-        for upload in schema['report_uploads']:
-            if not isinstance(upload, dict):
+    uploads = schema.get('report_uploads')
+    if isinstance(uploads, list):
+        for upload in uploads:
+            if not isinstance(upload, dict) or 'label' not in upload:
                 continue
             
-            # Ensure required properties
-            if 'id' not in upload or 'label' not in upload:
-                if 'label' in upload and 'id' not in upload:
-                    upload_id = re.sub(r'[^a-z0-9_]', '', upload['label'].lower().replace(' ', '_'))
-                    upload['id'] = upload_id[:50]
-                else:
-                    continue
-            
-            # Set default values
-            upload.setdefault('required', False)
-            upload.setdefault('description', '')
-            upload.setdefault('upload_type', 'medical_report')
-            
-            validated['report_uploads'].append(upload)
+            validated['report_uploads'].append({
+                'required': False,
+                'description': '',
+                'upload_type': 'medical_report',
+                **upload,
+                'id': upload['id'] if 'id' in upload else _id_from_label(upload['label']),
+            })
     
     return validated
 
 
+# Background workers for Groq generation so the HTTP worker is not held for
+# the full LLM latency. Each gunicorn worker process gets its own pool, so the
+# concurrency limit is per process. Jobs are not persisted: a form whose worker
+# dies mid-job is failed by AIIntakeForm.objects.fail_stale_generation().
+_INTAKE_FORM_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='intake-form')
+
+
+def generate_intake_form_task(form_id, doctor_prompt, patient_context=None):
+    """
+    Background job: generate the schema for a form created in 'generating' status
+    and move it to 'draft' on success or 'failed' with the error message
+    """
+    close_old_connections()
+    try:
+        result = generate_intake_form_with_gemini(doctor_prompt, patient_context)
+        
+        if result['success']:
+            AIIntakeForm.objects.filter(id=form_id, status='generating').update(
+                form_schema=result['form_schema'],
+                ai_raw_response=result['raw_response'],
+                generation_error='',
+                status='draft',
+                updated_at=timezone.now()
+            )
+        else:
+            AIIntakeForm.objects.filter(id=form_id, status='generating').update(
+                ai_raw_response=result.get('raw_response') or '',
+                generation_error=result['error'],
+                status='failed',
+                updated_at=timezone.now()
+            )
+    
+    except Exception as e:
+        AIIntakeForm.objects.filter(id=form_id, status='generating').update(
+            generation_error=f'Unexpected error during form generation: {str(e)}',
+            status='failed',
+            updated_at=timezone.now()
+        )
+    
+    finally:
+        close_old_connections()
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_ai_intake_form(request):
     """
     Create a new AI-generated intake form
     Doctor provides workspace_id and doctor_prompt
+    
+    Prompts matching a curated template get a 'draft' form immediately (201).
+    Otherwise the form is created in 'generating' status and the Groq call runs
+    in the background (202); poll the intake form detail endpoint until the
+    status becomes 'draft' (ready to edit) or 'failed' (see generation_error).
     """
     if not hasattr(request.user, 'doctor_profile'):
         return Response(
@@ -1432,38 +1538,50 @@ def create_ai_intake_form(request):
     description = serializer.validated_data.get('description', '')
     
     # Verify doctor has access to this workspace
-    if workspace.doctor != doctor_profile:
+    if workspace.doctor_id != doctor_profile.id:
         return Response(
             {'error': 'You do not have access to this workspace'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Build patient context for better AI generation
+    # Build patient context for better AI generation, leaving out empty values
+    # so they don't cost prompt tokens
     patient = workspace.patient
+    dob = patient.date_of_birth
+    today = timezone.now().date()
+    age = (today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))) if dob else None
     patient_context = {
-        'patient_name': patient.full_name,
-        'age': patient.date_of_birth.strftime('%Y-%m-%d') if patient.date_of_birth else None,
-        'known_conditions': patient.chronic_conditions if patient.chronic_conditions else None,
-        'allergies': patient.known_allergies if patient.known_allergies else None,
-    }
-    
-    # Generate form using Gemini API
-    result = generate_intake_form_with_gemini(doctor_prompt, patient_context)
-    
-    if not result['success']:
-        # Use 429 status code for quota errors, 500 for other errors
-        error_status = status.HTTP_429_TOO_MANY_REQUESTS if result.get('quota_exceeded') else status.HTTP_500_INTERNAL_SERVER_ERROR
+        key: value for key, value in {
+            'patient_name': patient.full_name,
+            'age': age,
+            'known_conditions': patient.chronic_conditions,
+            'allergies': patient.known_allergies,
+        }.items() if value not in (None, '')
+    } or None
+    
+    # Common requests are served from a curated template without calling Groq
+    template = match_intake_template(doctor_prompt)
+    if template:
+        intake_form = AIIntakeForm.objects.create(
+            workspace=workspace,
+            doctor=doctor_profile,
+            patient=patient,
+            title=title,
+            description=description,
+            doctor_prompt=doctor_prompt,
+            form_schema=validate_form_schema(template['schema']),
+            status='draft'
+        )
         return Response(
             {
-                'error': result['error'],
-                'raw_response': result.get('raw_response'),
-                'quota_exceeded': result.get('quota_exceeded', False),
-                'details': result.get('details')
+                'form_id': intake_form.id,
+                'status': intake_form.status,
+                'template': template['key']
             },
-            status=error_status
+            status=status.HTTP_201_CREATED
         )
     
-    # Create the intake form
+    # Create the intake form; the schema is filled in by the background job
     intake_form = AIIntakeForm.objects.create(
         workspace=workspace,
         doctor=doctor_profile,
@@ -1471,18 +1589,50 @@ def create_ai_intake_form(request):
         title=title,
         description=description,
         doctor_prompt=doctor_prompt,
-        form_schema=result['form_schema'],
-        ai_raw_response=result['raw_response'],
-        status='draft'
+        status='generating'
+    )
+    
+    # Generate form using Groq API in the background
+    _INTAKE_FORM_EXECUTOR.submit(
+        generate_intake_form_task, intake_form.id, doctor_prompt, patient_context
     )
     
-    # Return the created form
     return Response(
-        AIIntakeFormSerializer(intake_form, context={'request': request}).data,
-        status=status.HTTP_201_CREATED
+        {
+            'form_id': intake_form.id,
+            'status': intake_form.status
+        },
+        status=status.HTTP_202_ACCEPTED
     )
 
 
+_DOCTOR_INTAKE_LIST_COLUMNS = (
+    'id', 'title', 'status', 'created_at', 'sent_at', 'submitted_at', 'has_response',
+    'patient__full_name', 'patient__patient_id',
+    'response__is_complete', 'response__completion_percentage', 'response__last_saved_at',
+)
+
+
+def _doctor_intake_list_item(row):
+    """Shape one values() row of the doctor's intake form list"""
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'patient_name': row['patient__full_name'],
+        'patient_id': row['patient__patient_id'],
+        'status': row['status'],
+        'created_at': row['created_at'],
+        'sent_at': row['sent_at'],
+        'submitted_at': row['submitted_at'],
+        'has_response': row['has_response'],
+        'response_status': {
+            'is_complete': row['response__is_complete'],
+            'completion_percentage': row['response__completion_percentage'],
+            'last_saved_at': row['response__last_saved_at']
+        } if row['has_response'] else None
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def list_doctor_intake_forms(request):
@@ -1499,9 +1649,9 @@ def list_doctor_intake_forms(request):
     doctor_profile = request.user.doctor_profile
     
     # Base query
-    forms = AIIntakeForm.objects.filter(doctor=doctor_profile).select_related(
-        'patient', 'workspace'
-    ).prefetch_related('uploads', 'response')
+    forms = AIIntakeForm.objects.filter(doctor=doctor_profile)
+    forms.fail_stale_generation()
+    forms = forms.with_response_state()
     
     # Filter by workspace if provided
     workspace_id = request.query_params.get('workspace_id')
@@ -1513,12 +1663,23 @@ def list_doctor_intake_forms(request):
     if form_status:
         forms = forms.filter(status=form_status)
     
-    # Order by most recent first
-    forms = forms.order_by('-created_at')
+    # Order by most recent first, fetching the listed columns as plain dicts
+    # (the schema, AI and OCR JSON blobs stay in the database)
+    rows = forms.order_by('-created_at').values(*_DOCTOR_INTAKE_LIST_COLUMNS)
+    
+    paginator = IntakeFormListPagination()
+    page = paginator.paginate_queryset(rows, request)
+    if page is not None:
+        return Response({
+            'count': paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'forms': [_doctor_intake_list_item(row) for row in page]
+        }, status=status.HTTP_200_OK)
     
-    # Serialize and return
-    serializer = DoctorIntakeFormListSerializer(forms, many=True)
-    return Response({'forms': serializer.data}, status=status.HTTP_200_OK)
+    # Unpaged: read the rows in chunks
+    forms_data = [_doctor_intake_list_item(row) for row in rows.iterator(chunk_size=500)]
+    return Response({'forms': forms_data}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -1535,10 +1696,13 @@ def get_intake_form_detail(request, form_id):
     
     doctor_profile = request.user.doctor_profile
     
+    # Polled while generating; a job that died is reported as failed
+    AIIntakeForm.objects.filter(id=form_id, doctor=doctor_profile).fail_stale_generation()
+    
     try:
         form = AIIntakeForm.objects.select_related(
-            'patient', 'doctor', 'workspace'
-        ).prefetch_related('uploads', 'response').get(id=form_id)
+            'patient', 'doctor', 'workspace', 'response'
+        ).prefetch_related('uploads').get(id=form_id)
         
         # Verify access
         if form.doctor != doctor_profile:
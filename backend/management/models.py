@@ -1,7 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 
 
 class AdminProfile(models.Model):
@@ -11,6 +9,8 @@ class AdminProfile(models.Model):
     # Basic Information
     first_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100, blank=True)
+    full_name = models.CharField(max_length=201, blank=True, db_index=True, editable=False,
+                                 help_text="First + last name (or username), kept in sync on save")
     phone_number = models.CharField(max_length=20, blank=True)
     
     # Additional Details
@@ -31,13 +31,16 @@ class AdminProfile(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} - Admin" if self.first_name or self.last_name else f"{self.user.username} - Admin"
     
-    @property
-    def full_name(self):
+    def compose_full_name(self):
+        """First + last name, falling back to the username"""
         return f"{self.first_name} {self.last_name}".strip() or self.user.username
-
-
-@receiver(post_save, sender=User)
-def create_admin_profile(sender, instance, created, **kwargs):
-    """Create admin profile when a user is created (if they're an admin)"""
-    # This will be handled manually in the signup view
-    pass
+    
+    def save(self, *args, **kwargs):
+        # Keep the stored full name in sync with the name fields
+        self.full_name = self.compose_full_name()
+        
+        # A partial save must also write the derived name
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'full_name'}
+        
+        super().save(*args, **kwargs)
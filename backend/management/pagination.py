@@ -0,0 +1,7 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class DoctorListPagination(LimitOffsetPagination):
+    """?limit=&offset= paging for the admin doctor listings"""
+    default_limit = 50
+    max_limit = 200
@@ -0,0 +1,15 @@
+from rest_framework import permissions
+
+
+class IsAdmin(permissions.BasePermission):
+    """
+    Allows access only to users with an admin profile.
+
+    The session user is loaded with admin_profile already joined
+    (core.backends.ProfileModelBackend), so this check does not query.
+    """
+    # A dict detail is returned as the response body, matching the views' {'error': ...} shape
+    message = {'error': 'Admin access required'}
+
+    def has_permission(self, request, view):
+        return hasattr(request.user, 'admin_profile')
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.utils.crypto import constant_time_compare
+from django.db.models import Q
 from .models import AdminProfile
 
 
@@ -16,20 +18,23 @@ class AdminSignupSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'password_confirm')
     
     def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
+        # Check email and username uniqueness in a single query
+        errors = {}
+        taken = User.objects.filter(
+            Q(email=attrs['email']) | Q(username=attrs['username'])
+        ).values_list('email', 'username')
+        for email, username in taken:
+            if email == attrs['email']:
+                errors['email'] = ["A user with this email already exists."]
+            if username == attrs['username']:
+                errors['username'] = ["A user with this username already exists."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        
+        if not constant_time_compare(attrs['password'], attrs['password_confirm']):
             raise serializers.ValidationError({"password": "Passwords don't match."})
         return attrs
     
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-    
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-        return value
-    
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
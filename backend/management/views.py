@@ -4,7 +4,11 @@ from rest_framework.response import Response
 from django.contrib.auth import login
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.core.cache import cache
+from django.utils import timezone
 from .models import AdminProfile
+from .pagination import DoctorListPagination
+from .permissions import IsAdmin
 from .serializers import (
     AdminSignupSerializer,
     AdminLoginSerializer,
@@ -12,6 +16,10 @@ from .serializers import (
     AdminProfileUpdateSerializer,
     UserSerializer
 )
+import logging
+
+
+logger = logging.getLogger(__name__)
 
 
 @ensure_csrf_cookie
@@ -19,37 +27,26 @@ from .serializers import (
 @permission_classes([permissions.AllowAny])
 def admin_signup(request):
     """Admin signup endpoint"""
-    print(f"Admin signup request data: {request.data}")  # Debug logging
     serializer = AdminSignupSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
         
-        # Authenticate the user to set the backend attribute
-        from django.contrib.auth import authenticate
-        authenticated_user = authenticate(
-            request,
-            username=user.username,
-            password=request.data.get('password')
-        )
+        # Log the new user in (creates session); the password was just set, so
+        # there is no need to hash it again through authenticate()
+        login(request, user, backend='core.backends.ProfileModelBackend')
+        
+        # Get admin profile
+        admin_profile = user.admin_profile
         
-        if authenticated_user:
-            # Log the user in (creates session)
-            login(request, authenticated_user)
-            
-            # Get admin profile
-            admin_profile = authenticated_user.admin_profile
-            
-            return Response({
-                'message': 'Admin account created successfully',
-                'user': UserSerializer(authenticated_user).data,
-                'profile': AdminProfileSerializer(admin_profile).data,
-                'profile_completed': admin_profile.profile_completed,
-                'redirect_to': 'dashboard'  # Admin always redirects to dashboard
-            }, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'error': 'Failed to authenticate user'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'message': 'Admin account created successfully',
+            'user': UserSerializer(user).data,
+            'profile': AdminProfileSerializer(admin_profile).data,
+            'profile_completed': admin_profile.profile_completed,
+            'redirect_to': 'dashboard'  # Admin always redirects to dashboard
+        }, status=status.HTTP_201_CREATED)
     
-    print(f"Admin signup validation errors: {serializer.errors}")  # Debug logging
+    logger.debug("Admin signup validation errors: %s", serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -58,37 +55,26 @@ def admin_signup(request):
 @permission_classes([permissions.AllowAny])
 def admin_login(request):
     """Admin login endpoint"""
-    print(f"Admin login request data: {request.data}")  # Debug logging
     serializer = AdminLoginSerializer(data=request.data)
     if serializer.is_valid():
+        # The serializer already authenticated the user (which also sets user.backend)
         user = serializer.validated_data['user']
         
-        # Authenticate again to ensure backend attribute is set
-        from django.contrib.auth import authenticate
-        authenticated_user = authenticate(
-            request,
-            username=request.data.get('username'),
-            password=request.data.get('password')
-        )
+        # Log the user in (creates session)
+        login(request, user)
+        
+        # Get admin profile
+        admin_profile = user.admin_profile
         
-        if authenticated_user:
-            # Log the user in (creates session)
-            login(request, authenticated_user)
-            
-            # Get admin profile
-            admin_profile = authenticated_user.admin_profile
-            
-            return Response({
-                'message': 'Login successful',
-                'user': UserSerializer(authenticated_user).data,
-                'profile': AdminProfileSerializer(admin_profile).data,
-                'profile_completed': admin_profile.profile_completed,
-                'redirect_to': 'dashboard'  # Admin always redirects to dashboard
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({'error': 'Authentication failed'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({
+            'message': 'Login successful',
+            'user': UserSerializer(user).data,
+            'profile': AdminProfileSerializer(admin_profile).data,
+            'profile_completed': admin_profile.profile_completed,
+            'redirect_to': 'dashboard'  # Admin always redirects to dashboard
+        }, status=status.HTTP_200_OK)
     
-    print(f"Admin login validation errors: {serializer.errors}")  # Debug logging
+    logger.debug("Admin login validation errors: %s", serializer.errors)
     # Return detailed error information
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -153,50 +139,75 @@ def admin_current_user(request):
 
 # ==================== DOCTOR VERIFICATION (ADMIN ONLY) ====================
 
+PENDING_DOCTORS_CACHE_TIMEOUT = 300  # seconds
+
+
+def _paginated_doctors_data(doctors, request):
+    """One page of serialized doctors with the total count and next/previous links"""
+    from doctor.serializers import DoctorProfileSerializer
+    
+    paginator = DoctorListPagination()
+    page = paginator.paginate_queryset(doctors, request)
+    serializer = DoctorProfileSerializer(page, many=True, context={'request': request})
+    
+    return {
+        'count': paginator.count,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'doctors': list(serializer.data)
+    }
+
+
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
 def pending_doctors_list(request):
     """Get list of doctors pending verification (Admin only)"""
-    # Check if user is admin
-    try:
-        request.user.admin_profile
-    except:
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    from doctor.models import DoctorProfile, doctor_listings_version
     
-    from doctor.models import DoctorProfile
-    from doctor.serializers import DoctorProfileSerializer
+    # Cached per page until any doctor profile changes (the version moves) or the timeout
+    # passes; the host is part of the key because license and page URLs are absolute
+    cache_key = 'pending_doctors_v1:{}:{}:{}:{}'.format(
+        doctor_listings_version(), request.get_host(),
+        request.query_params.get('limit', ''), request.query_params.get('offset', '')
+    )
+    data = cache.get(cache_key)
     
-    pending_doctors = DoctorProfile.objects.filter(profile_status='pending').order_by('-submitted_at')
-    serializer = DoctorProfileSerializer(pending_doctors, many=True, context={'request': request})
+    if data is None:
+        # username/email come from the user, joined in the same query
+        pending_doctors = DoctorProfile.objects.filter(
+            profile_status='pending'
+        ).select_related('user').order_by('-submitted_at')
+        
+        data = _paginated_doctors_data(pending_doctors, request)
+        cache.set(cache_key, data, PENDING_DOCTORS_CACHE_TIMEOUT)
     
-    return Response({
-        'count': pending_doctors.count(),
-        'doctors': serializer.data
-    }, status=status.HTTP_200_OK)
+    return Response(data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
 def verify_doctor(request, doctor_id):
     """Verify a doctor profile (Admin only)"""
-    # Check if user is admin
-    try:
-        request.user.admin_profile
-    except:
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    from doctor.models import DoctorProfile
+    from doctor.models import DoctorProfile, invalidate_doctor_listings
     from doctor.serializers import DoctorProfileSerializer
     
-    try:
-        doctor_profile = DoctorProfile.objects.get(id=doctor_id)
-    except DoctorProfile.DoesNotExist:
-        return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    # Verify in one conditional UPDATE, so two admins acting at once cannot both apply
+    now = timezone.now()
+    updated = DoctorProfile.objects.filter(id=doctor_id, profile_status='pending').update(
+        profile_status='verified',
+        verified_by=request.user,
+        verified_at=now,
+        profile_completed=True,
+        updated_at=now
+    )
     
-    if doctor_profile.profile_status != 'pending':
-        return Response({'error': 'Only pending profiles can be verified'}, status=status.HTTP_400_BAD_REQUEST)
+    if not updated:
+        if DoctorProfile.objects.filter(id=doctor_id).exists():
+            return Response({'error': 'Only pending profiles can be verified'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    doctor_profile.verify_profile(request.user)
+    invalidate_doctor_listings()  # update() skips the post_save receiver
+    doctor_profile = DoctorProfile.objects.select_related('user').get(id=doctor_id)
     
     return Response({
         'message': 'Doctor verified successfully',
@@ -205,28 +216,29 @@ def verify_doctor(request, doctor_id):
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
 def reject_doctor(request, doctor_id):
     """Reject a doctor profile (Admin only)"""
-    # Check if user is admin
-    try:
-        request.user.admin_profile
-    except:
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    from doctor.models import DoctorProfile
+    from doctor.models import DoctorProfile, invalidate_doctor_listings
     from doctor.serializers import DoctorProfileSerializer
     
-    try:
-        doctor_profile = DoctorProfile.objects.get(id=doctor_id)
-    except DoctorProfile.DoesNotExist:
-        return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    reason = request.data.get('reason', 'No reason provided')
     
-    if doctor_profile.profile_status != 'pending':
-        return Response({'error': 'Only pending profiles can be rejected'}, status=status.HTTP_400_BAD_REQUEST)
+    # Reject in one conditional UPDATE, so two admins acting at once cannot both apply
+    updated = DoctorProfile.objects.filter(id=doctor_id, profile_status='pending').update(
+        profile_status='rejected',
+        rejection_reason=reason,
+        verified_by=request.user,
+        updated_at=timezone.now()
+    )
     
-    reason = request.data.get('reason', 'No reason provided')
-    doctor_profile.reject_profile(request.user, reason)
+    if not updated:
+        if DoctorProfile.objects.filter(id=doctor_id).exists():
+            return Response({'error': 'Only pending profiles can be rejected'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    invalidate_doctor_listings()  # update() skips the post_save receiver
+    doctor_profile = DoctorProfile.objects.select_related('user').get(id=doctor_id)
     
     return Response({
         'message': 'Doctor profile rejected',
@@ -235,28 +247,16 @@ def reject_doctor(request, doctor_id):
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAuthenticated, IsAdmin])
 def all_doctors_list(request):
     """Get list of all doctors with filters (Admin only)"""
-    # Check if user is admin
-    try:
-        request.user.admin_profile
-    except:
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
     from doctor.models import DoctorProfile
-    from doctor.serializers import DoctorProfileSerializer
     
     status_filter = request.query_params.get('status', None)
     
-    doctors = DoctorProfile.objects.all().order_by('-created_at')
+    doctors = DoctorProfile.objects.select_related('user').order_by('-created_at')
     
     if status_filter:
         doctors = doctors.filter(profile_status=status_filter)
     
-    serializer = DoctorProfileSerializer(doctors, many=True, context={'request': request})
-    
-    return Response({
-        'count': doctors.count(),
-        'doctors': serializer.data
-    }, status=status.HTTP_200_OK)
+    return Response(_paginated_doctors_data(doctors, request), status=status.HTTP_200_OK)
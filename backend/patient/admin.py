@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (
     PatientProfile, 
+    PatientDoctorConnection,
     AIIntakeForm, 
     IntakeFormResponse, 
     IntakeFormUpload
@@ -36,6 +37,23 @@ class PatientProfileAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(PatientDoctorConnection)
+class PatientDoctorConnectionAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'status', 'connection_type', 'created_at', 'accepted_at')
+    list_filter = ('status', 'connection_type', 'initiated_by', 'created_at')
+    search_fields = ('patient__full_name', 'patient__patient_id', 'doctor__full_name', 'doctor__doctor_id')
+    readonly_fields = ('created_at', 'updated_at', 'accepted_at')
+    list_select_related = ('patient', 'doctor')
+    
+    actions = ['accept_connections']
+    
+    def accept_connections(self, request, queryset):
+        """Bulk accept pending connections"""
+        count = PatientDoctorConnection.objects.bulk_accept(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{count} connection(s) accepted.')
+    accept_connections.short_description = 'Accept selected connections'
+
+
 @admin.register(AIIntakeForm)
 class AIIntakeFormAdmin(admin.ModelAdmin):
     list_display = ('title', 'doctor', 'patient', 'status', 'created_at', 'sent_at', 'submitted_at')
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0007_medicalreport_reportcomment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiintakeform',
+            name='generation_error',
+            field=models.TextField(blank=True, help_text='Error message if AI generation failed'),
+        ),
+        migrations.AlterField(
+            model_name='aiintakeform',
+            name='status',
+            field=models.CharField(choices=[('generating', 'AI Generating'), ('failed', 'Generation Failed'), ('draft', 'Draft'), ('sent', 'Sent to Patient'), ('in_progress', 'Patient is Filling'), ('submitted', 'Submitted by Patient'), ('reviewed', 'Reviewed by Doctor')], default='draft', max_length=20),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0002_alter_doctorprofile_options_doctorprofile_city_and_more'),
+        ('patient', '0008_aiintakeform_generation_error_alter_aiintakeform_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientdoctorconnection',
+            index=models.Index(fields=['doctor', 'status', '-created_at'], name='pdc_doc_stat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdoctorconnection',
+            index=models.Index(fields=['doctor', 'status', '-accepted_at'], name='pdc_doc_stat_accept_idx'),
+        ),
+    ]
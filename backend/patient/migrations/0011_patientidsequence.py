@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+def seed_patient_id_sequences(apps, schema_editor):
+    """Start each year's sequence after the highest PT-YYYY-XXXXX already issued"""
+    PatientProfile = apps.get_model('patient', 'PatientProfile')
+    PatientIdSequence = apps.get_model('patient', 'PatientIdSequence')
+    
+    last_numbers = {}
+    for patient_id in PatientProfile.objects.filter(patient_id__startswith='PT-').values_list('patient_id', flat=True):
+        try:
+            _, year, number = patient_id.split('-')
+            year, number = int(year), int(number)
+        except ValueError:
+            continue
+        last_numbers[year] = max(number, last_numbers.get(year, 0))
+    
+    PatientIdSequence.objects.bulk_create(
+        PatientIdSequence(year=year, last_number=number) for year, number in last_numbers.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0010_patientprofile_full_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientIdSequence',
+            fields=[
+                ('year', models.IntegerField(primary_key=True, serialize=False)),
+                ('last_number', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_patient_id_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:26
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_welcome_entries(apps, schema_editor):
+    """Keep only the first welcome entry of each workspace so the constraint can be added"""
+    DoctorPatientTimelineEntry = apps.get_model('patient', 'DoctorPatientTimelineEntry')
+    welcome_entries = DoctorPatientTimelineEntry.objects.filter(created_by='system', title='Connection Activated')
+    first_ids = welcome_entries.values('workspace').annotate(first_id=Min('id')).values('first_id')
+    welcome_entries.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0011_patientidsequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_welcome_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='doctorpatienttimelineentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('created_by', 'system'), ('title', 'Connection Activated')), fields=('workspace',), name='timeline_one_welcome_entry'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor', '0004_doctorprofile_doc_status_submitted_idx'),
+        ('patient', '0012_timeline_one_welcome_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='connectiontoken',
+            index=models.Index(fields=['doctor', 'expires_at'], name='token_doc_expires_idx'),
+        ),
+    ]
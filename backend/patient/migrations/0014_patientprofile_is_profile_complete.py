@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-16 23:34
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def populate_is_profile_complete(apps, schema_editor):
+    """Same rule as PatientProfile.compute_profile_complete()"""
+    PatientProfile = apps.get_model('patient', 'PatientProfile')
+    PatientProfile.objects.exclude(
+        Q(first_name='') | Q(last_name='') | Q(date_of_birth__isnull=True) | Q(phone_number='')
+        | Q(emergency_contact_name='') | Q(emergency_contact_phone='') | Q(consent_given=False)
+    ).update(is_profile_complete=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0013_connectiontoken_token_doc_expires_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientprofile',
+            name='is_profile_complete',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='All required fields filled, kept in sync on save'),
+        ),
+        migrations.RunPython(populate_is_profile_complete, migrations.RunPython.noop),
+    ]
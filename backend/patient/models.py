@@ -1,14 +1,41 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import Coalesce, Now, NullIf
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
-import datetime
+from datetime import timedelta
 import secrets
-import hashlib
 import os
 
 
+class PatientIdSequence(models.Model):
+    """Last patient ID number handed out per year (PT-YYYY-XXXXX)"""
+    year = models.IntegerField(primary_key=True)
+    last_number = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"PT-{self.year}: {self.last_number}"
+    
+    @classmethod
+    def reserve(cls, year, count=1):
+        """
+        Reserve count consecutive numbers for year and return the first one. The row is
+        incremented before it is read, so concurrent signups each get their own numbers
+        instead of racing on max+1.
+        """
+        with transaction.atomic():
+            sequence = cls.objects.filter(year=year)
+            if not sequence.update(last_number=F('last_number') + count):
+                # First patient of the year
+                _, created = cls.objects.get_or_create(year=year, defaults={'last_number': count})
+                if not created:  # another signup started the year first
+                    sequence.update(last_number=F('last_number') + count)
+            return sequence.values_list('last_number', flat=True).get() - count + 1
+
+
 class PatientProfile(models.Model):
     """Extended profile for patients with 3-step setup wizard"""
     
@@ -43,6 +70,8 @@ class PatientProfile(models.Model):
     # Step 1 - Basic Identity & Contact (Required)
     first_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100, blank=True)
+    full_name = models.CharField(max_length=201, blank=True, db_index=True, editable=False,
+                                 help_text="First + last name (or username), kept in sync on save")
     date_of_birth = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=20, choices=GENDER_CHOICES, blank=True)
     phone_number = models.CharField(max_length=20, blank=True)
@@ -71,6 +100,8 @@ class PatientProfile(models.Model):
     
     # Profile Completion Status
     profile_completed = models.BooleanField(default=False)
+    is_profile_complete = models.BooleanField(default=False, db_index=True, editable=False,
+                                              help_text="All required fields filled, kept in sync on save")
     current_step = models.IntegerField(default=0, help_text="Current step in profile setup (0-3)")
     
     # Timestamps
@@ -85,37 +116,55 @@ class PatientProfile(models.Model):
     def __str__(self):
         return f"{self.full_name} - {self.patient_id or 'No ID'}"
     
-    @property
-    def full_name(self):
+    def compose_full_name(self):
+        """First + last name, falling back to the username"""
         return f"{self.first_name} {self.last_name}".strip() or self.user.username
     
     def generate_patient_id(self):
         """Generate unique patient ID in format PT-YYYY-XXXXX"""
         if not self.patient_id:
-            year = datetime.datetime.now().year
-            # Get the last patient ID created this year
-            last_patient = PatientProfile.objects.filter(
-                patient_id__startswith=f'PT-{year}-'
-            ).order_by('-patient_id').first()
-            
-            if last_patient and last_patient.patient_id:
-                last_number = int(last_patient.patient_id.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.patient_id = f'PT-{year}-{new_number:05d}'
+            year = timezone.now().year
+            self.patient_id = f'PT-{year}-{PatientIdSequence.reserve(year):05d}'
         return self.patient_id
     
+    @classmethod
+    def prepare_bulk_create(cls, profiles):
+        """
+        Fill in what save() would (patient_id, full_name, is_profile_complete) on profiles about
+        to be passed to bulk_create(), which skips save(). All missing IDs come from one
+        sequence reservation.
+        """
+        missing_id = [profile for profile in profiles if not profile.patient_id]
+        if missing_id:
+            year = timezone.now().year
+            first_number = PatientIdSequence.reserve(year, len(missing_id))
+            for offset, profile in enumerate(missing_id):
+                profile.patient_id = f'PT-{year}-{first_number + offset:05d}'
+        
+        for profile in profiles:
+            profile.full_name = profile.compose_full_name()
+            profile.is_profile_complete = profile.compute_profile_complete()
+        return profiles
+    
     def save(self, *args, **kwargs):
+        derived_fields = ['full_name', 'is_profile_complete']
+        
         # Auto-generate patient ID if not present
         if not self.patient_id:
             self.generate_patient_id()
+            derived_fields.append('patient_id')
+        
+        # Keep the stored full name and completion flag in sync with their fields
+        self.full_name = self.compose_full_name()
+        self.is_profile_complete = self.compute_profile_complete()
+        
+        # A partial save must also write the columns derived above
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *derived_fields}
         
         super().save(*args, **kwargs)
     
-    @property
-    def is_profile_complete(self):
+    def compute_profile_complete(self):
         """Check if minimum required fields are filled"""
         required_fields = [
             self.first_name,
@@ -129,10 +178,19 @@ class PatientProfile(models.Model):
         return all(required_fields)
 
 
+class ConnectionTokenQuerySet(models.QuerySet):
+    def valid(self):
+        """Tokens that can still be used, checked in SQL (same rule as ConnectionToken.is_valid)"""
+        return self.filter(expires_at__gte=Now(), use_count__lt=F('max_uses'))
+
+
 class ConnectionToken(models.Model):
     """Model to manage QR code tokens for doctor-patient connections"""
     
-    # Generate secure token
+    # Generate secure token (generate_token: 43 base64url characters). The column
+    # stays 64 wide because tokens from the earlier 64-character hex format remain
+    # valid for up to a week (the maximum expiry) after the format change; shrink
+    # it to 43 in a later migration once those have expired.
     token = models.CharField(max_length=64, unique=True, editable=False)
     
     # Doctor who generated this token
@@ -155,6 +213,12 @@ class ConnectionToken(models.Model):
         verbose_name = "Connection Token"
         verbose_name_plural = "Connection Tokens"
         ordering = ['-created_at']
+        indexes = [
+            # A doctor's still-valid tokens (dashboard count via objects.valid())
+            models.Index(fields=['doctor', 'expires_at'], name='token_doc_expires_idx'),
+        ]
+    
+    objects = ConnectionTokenQuerySet.as_manager()
     
     def __str__(self):
         status = "Used" if self.is_used else ("Expired" if self.is_expired else "Active")
@@ -162,14 +226,17 @@ class ConnectionToken(models.Model):
     
     @classmethod
     def generate_token(cls):
-        """Generate a secure random token"""
-        random_string = secrets.token_urlsafe(32)
-        return hashlib.sha256(random_string.encode()).hexdigest()
+        """Generate a secure random token (43 base64url chars, 256 bits of entropy)"""
+        return secrets.token_urlsafe(32)
+    
+    @staticmethod
+    def cache_key(token):
+        """Cache key of a token looked up for a QR preview (see patient.views.validate_qr_token)"""
+        return f'qr_token:{token}'
     
     @property
     def is_expired(self):
         """Check if token has expired"""
-        from django.utils import timezone
         return timezone.now() > self.expires_at
     
     @property
@@ -179,13 +246,13 @@ class ConnectionToken(models.Model):
     
     def mark_as_used(self, patient):
         """Mark token as used by a patient"""
-        from django.utils import timezone
         self.use_count += 1
         if self.use_count >= self.max_uses:
             self.is_used = True
         self.used_by_patient = patient
         self.used_at = timezone.now()
-        self.save()
+        self.save(update_fields=['use_count', 'is_used', 'used_by_patient', 'used_at'])
+        cache.delete(self.cache_key(self.token))
     
     def save(self, *args, **kwargs):
         # Generate token if not present
@@ -194,6 +261,58 @@ class ConnectionToken(models.Model):
         super().save(*args, **kwargs)
 
 
+class PatientDoctorConnectionQuerySet(models.QuerySet):
+    def bulk_accept(self, ids, note=''):
+        """
+        Accept the pending connections in ids, creating their workspaces and welcome
+        entries in a fixed number of queries. Returns the number of accepted connections.
+        """
+        with transaction.atomic():
+            pending = list(
+                self.select_for_update(of=('self',))
+                .filter(pk__in=ids, status='pending')
+                .order_by()
+                .values_list('pk', 'patient_id', 'doctor_id', 'doctor__display_name', 'doctor__full_name')
+            )
+            if not pending:
+                return 0
+            
+            accepted_ids = [row[0] for row in pending]
+            now = timezone.now()
+            self.filter(pk__in=accepted_ids).update(
+                status='accepted', accepted_at=now, doctor_note=note, updated_at=now
+            )
+            
+            # update() sends no post_save; this is DoctorPatientWorkspace.ensure_for_connection()
+            # done in bulk. Connections that already have a workspace or welcome entry are skipped
+            DoctorPatientWorkspace.objects.bulk_create([
+                DoctorPatientWorkspace(
+                    connection_id=connection_id,
+                    patient_id=patient_id,
+                    doctor_id=doctor_id,
+                    title=DoctorPatientWorkspace.default_title(display_name or full_name),
+                    summary=DoctorPatientWorkspace.DEFAULT_SUMMARY,
+                )
+                for connection_id, patient_id, doctor_id, display_name, full_name in pending
+            ], ignore_conflicts=True)
+            
+            workspace_ids = DoctorPatientWorkspace.objects.filter(
+                connection_id__in=accepted_ids
+            ).order_by().values_list('id', flat=True)
+            DoctorPatientTimelineEntry.objects.bulk_create([
+                DoctorPatientTimelineEntry(
+                    workspace_id=workspace_id,
+                    entry_type='update',
+                    title=WELCOME_ENTRY_TITLE,
+                    summary=WELCOME_ENTRY_SUMMARY,
+                    created_by='system',
+                )
+                for workspace_id in workspace_ids
+            ], ignore_conflicts=True)
+        
+        return len(accepted_ids)
+
+
 class PatientDoctorConnection(models.Model):
     """Model to manage patient-doctor connections/linking"""
     
@@ -236,27 +355,52 @@ class PatientDoctorConnection(models.Model):
         verbose_name_plural = "Patient-Doctor Connections"
         unique_together = ['patient', 'doctor']
         ordering = ['-created_at']
+        indexes = [
+            # Doctor's pending requests (newest first) and connected patients lists
+            models.Index(fields=['doctor', 'status', '-created_at'], name='pdc_doc_stat_created_idx'),
+            models.Index(fields=['doctor', 'status', '-accepted_at'], name='pdc_doc_stat_accept_idx'),
+        ]
+    
+    objects = PatientDoctorConnectionQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.patient.full_name} <-> {self.doctor.full_name} ({self.status})"
     
+    def _update_fields(self, **fields):
+        """UPDATE only the given columns (plus updated_at) and mirror them on the instance"""
+        fields.setdefault('updated_at', timezone.now())
+        type(self).objects.filter(pk=self.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+    
     def accept_connection(self, note=''):
         """Accept the connection request"""
-        self.status = 'accepted'
-        self.accepted_at = datetime.datetime.now()
-        self.doctor_note = note
-        self.save()
+        now = timezone.now()
+        self._update_fields(status='accepted', accepted_at=now, doctor_note=note, updated_at=now)
+        # update() does not send post_save, so create the workspace explicitly
+        DoctorPatientWorkspace.ensure_for_connection(self).sync_metadata()
     
     def reject_connection(self, note=''):
         """Reject the connection request"""
-        self.status = 'rejected'
-        self.doctor_note = note
-        self.save()
+        self._update_fields(status='rejected', doctor_note=note)
     
     def remove_connection(self):
         """Remove the connection"""
-        self.status = 'removed'
-        self.save()
+        self._update_fields(status='removed')
+
+
+class DoctorPatientWorkspaceQuerySet(models.QuerySet):
+    def for_summary(self):
+        """
+        Columns DoctorPatientWorkspaceSummarySerializer reads, with the doctor's shown
+        name (display_name, else full_name) worked out in SQL as doctor_name
+        """
+        return self.select_related('doctor', 'patient').annotate(
+            doctor_name=Coalesce(NullIf('doctor__display_name', Value('')), 'doctor__full_name')
+        ).only(
+            'id', 'connection_id', 'title', 'summary', 'status', 'next_review_date', 'updated_at',
+            'doctor__doctor_id', 'patient__full_name', 'patient__patient_id'
+        )
 
 
 class DoctorPatientWorkspace(models.Model):
@@ -300,41 +444,83 @@ class DoctorPatientWorkspace(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DoctorPatientWorkspaceQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']
         verbose_name = 'Doctor Patient Workspace'
         verbose_name_plural = 'Doctor Patient Workspaces'
 
+    DEFAULT_SUMMARY = 'Centralized updates, treatment plans, and guidance from your doctor.'
+
     def __str__(self):
         return f"Workspace: {self.patient.full_name} ↔ {self.doctor.display_name or self.doctor.full_name}"
 
+    @staticmethod
+    def default_title(doctor_name):
+        return f"{doctor_name} Care Space"
+
     @classmethod
     def ensure_for_connection(cls, connection):
-        """Return an existing workspace or create a default one for the connection."""
-        workspace, _ = cls.objects.get_or_create(
+        """Return an existing workspace or create a default one (with its welcome entry) for the connection."""
+        def default_title():
+            # Only evaluated (and the doctor only loaded) when the workspace is created
+            doctor = connection.doctor
+            return cls.default_title(doctor.display_name or doctor.full_name)
+        
+        workspace, created = cls.objects.get_or_create(
             connection=connection,
             defaults={
-                'patient': connection.patient,
-                'doctor': connection.doctor,
-                'title': f"{connection.doctor.display_name or connection.doctor.full_name} Care Space",
-                'summary': 'Centralized updates, treatment plans, and guidance from your doctor.',
+                'patient_id': connection.patient_id,
+                'doctor_id': connection.doctor_id,
+                'title': default_title,
+                'summary': cls.DEFAULT_SUMMARY,
             }
         )
+        if created:
+            # A new workspace has no entries yet, so no lookup is needed before adding the welcome
+            DoctorPatientTimelineEntry.objects.create(
+                workspace=workspace,
+                entry_type='update',
+                title=WELCOME_ENTRY_TITLE,
+                summary=WELCOME_ENTRY_SUMMARY,
+                created_by='system'
+            )
+        # Reuse the caller's connection, and the profiles loaded with it, so sync_metadata()
+        # and the workspace serializers do not fetch them again
+        workspace.connection = connection
+        if workspace.patient_id == connection.patient_id and PatientDoctorConnection.patient.is_cached(connection):
+            workspace.patient = connection.patient
+        if workspace.doctor_id == connection.doctor_id and PatientDoctorConnection.doctor.is_cached(connection):
+            workspace.doctor = connection.doctor
         return workspace
 
     def sync_metadata(self):
         """Ensure patient/doctor references stay in sync with connection."""
         updated = False
         if self.patient_id != self.connection.patient_id:
-            self.patient = self.connection.patient
+            self.patient_id = self.connection.patient_id
             updated = True
         if self.doctor_id != self.connection.doctor_id:
-            self.doctor = self.connection.doctor
+            self.doctor_id = self.connection.doctor_id
             updated = True
         if updated:
             super().save(update_fields=['patient', 'doctor', 'updated_at'])
 
 
+class DoctorPatientTimelineEntryQuerySet(models.QuerySet):
+    def for_list(self):
+        """Skip the potentially large body columns that feeds and dashboards don't show"""
+        return self.defer('details', 'attachments', 'follow_up_actions', 'meta')
+
+
+# System entry added once to every new workspace
+WELCOME_ENTRY_TITLE = 'Connection Activated'
+WELCOME_ENTRY_SUMMARY = (
+    'This dedicated space will capture all treatment updates, doctor notes, and guidance for this care journey.'
+)
+
+
 class DoctorPatientTimelineEntry(models.Model):
     """Timeline of updates, treatments, and guidelines for a workspace"""
 
@@ -379,10 +565,20 @@ class DoctorPatientTimelineEntry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DoctorPatientTimelineEntryQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Doctor Patient Timeline Entry'
         verbose_name_plural = 'Doctor Patient Timeline Entries'
+        constraints = [
+            # At most one welcome entry per workspace (see DoctorPatientWorkspace.ensure_for_connection)
+            models.UniqueConstraint(
+                fields=['workspace'],
+                condition=Q(created_by='system', title=WELCOME_ENTRY_TITLE),
+                name='timeline_one_welcome_entry',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.workspace} · {self.entry_type} · {self.title}"
@@ -392,34 +588,47 @@ class DoctorPatientTimelineEntry(models.Model):
 def auto_create_workspace(sender, instance, **kwargs):
     """Ensure every accepted connection has a workspace."""
     if instance.status == 'accepted':
-        workspace = DoctorPatientWorkspace.ensure_for_connection(instance)
-        workspace.sync_metadata()
-        # If this acceptance was recent and there are no entries, add a welcome entry
-        if not workspace.timeline_entries.exists():
-            DoctorPatientTimelineEntry.objects.create(
-                workspace=workspace,
-                entry_type='update',
-                title='Connection Activated',
-                summary='This dedicated space will capture all treatment updates, doctor notes, and guidance for this care journey.',
-                created_by='system'
-            )
-
-
-@receiver(post_save, sender=User)
-def create_patient_profile(sender, instance, created, **kwargs):
-    """Create patient profile when a user is created (if they're a patient)"""
-    # This will be handled manually in the signup view
-    pass
+        # A newly created workspace comes with its welcome entry
+        DoctorPatientWorkspace.ensure_for_connection(instance).sync_metadata()
 
 
 # ===========================
 # AI Intake Form Models
 # ===========================
 
+class AIIntakeFormQuerySet(models.QuerySet):
+    def with_response_state(self):
+        """
+        Annotate has_response and response_completion_percentage from a join to the
+        response row, for the intake form lists
+        """
+        return self.annotate(
+            has_response=ExpressionWrapper(Q(response__isnull=False), output_field=BooleanField()),
+            response_completion_percentage=Coalesce('response__completion_percentage', 0)
+        )
+    
+    def fail_stale_generation(self):
+        """
+        Mark forms stuck in 'generating' as 'failed'
+
+        Generation runs in an in-process thread pool, so a gunicorn worker that
+        restarts mid-job leaves its form in 'generating' with nobody to finish it.
+        Called before forms are listed or read so polling clients see the failure.
+        """
+        cutoff = timezone.now() - self.model.GENERATION_TIMEOUT
+        return self.filter(status='generating', updated_at__lt=cutoff).update(
+            status='failed',
+            generation_error='Form generation did not finish. Please try again.',
+            updated_at=timezone.now()
+        )
+
+
 class AIIntakeForm(models.Model):
     """AI-generated intake forms that doctors send to patients"""
     
     STATUS_CHOICES = [
+        ('generating', 'AI Generating'),
+        ('failed', 'Generation Failed'),
         ('draft', 'Draft'),
         ('sent', 'Sent to Patient'),
         ('in_progress', 'Patient is Filling'),
@@ -451,6 +660,7 @@ class AIIntakeForm(models.Model):
     # AI generation data
     doctor_prompt = models.TextField(help_text='Doctor\'s input prompt for AI generation')
     ai_raw_response = models.TextField(blank=True, help_text='Raw AI response for debugging')
+    generation_error = models.TextField(blank=True, help_text='Error message if AI generation failed')
     
     # Form schema (JSON structure of fields)
     form_schema = models.JSONField(
@@ -484,6 +694,15 @@ class AIIntakeForm(models.Model):
         help_text='Aggregated OCR results from all uploaded documents'
     )
     
+    # Statuses a patient must never see (form not ready or not sent yet)
+    UNSENT_STATUSES = ('generating', 'failed', 'draft')
+    
+    # Longer than the worst case of generate_intake_form_with_gemini's retries,
+    # so only forms whose background job died are treated as stale
+    GENERATION_TIMEOUT = timedelta(minutes=10)
+    
+    objects = AIIntakeFormQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'AI Intake Form'
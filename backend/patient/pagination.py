@@ -0,0 +1,7 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+
+class IntakeFormListPagination(LimitOffsetPagination):
+    """Opt-in ?limit=&offset= paging for the intake form listings; without ?limit= the full list is returned"""
+    default_limit = None
+    max_limit = 200
@@ -1,8 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.utils.crypto import constant_time_compare
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from django.utils import timezone
+from datetime import date
+from functools import cached_property
 import os
+from core.media import absolute_file_url
 from .models import (
     PatientProfile,
     PatientDoctorConnection,
@@ -26,7 +32,7 @@ class PatientSignupSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'password_confirm')
     
     def validate(self, attrs):
-        if attrs['password'] != attrs['password_confirm']:
+        if not constant_time_compare(attrs['password'], attrs['password_confirm']):
             raise serializers.ValidationError({"password": "Passwords don't match."})
         return attrs
     
@@ -43,11 +49,13 @@ class PatientSignupSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm')
         password = validated_data.pop('password')
-        # create_user automatically hashes the password
-        user = User.objects.create_user(password=password, **validated_data)
-        
-        # Create patient profile
-        PatientProfile.objects.create(user=user)
+        # The user and profile are created together or not at all
+        with transaction.atomic():
+            # create_user automatically hashes the password
+            user = User.objects.create_user(password=password, **validated_data)
+            
+            # Create patient profile
+            PatientProfile.objects.create(user=user)
         
         return user
 
@@ -66,7 +74,7 @@ class PatientLoginSerializer(serializers.Serializer):
                 'non_field_errors': ["Must include both 'username' and 'password'."]
             })
         
-        user = authenticate(username=username, password=password)
+        user = authenticate(self.context.get('request'), username=username, password=password)
         if not user:
             raise serializers.ValidationError({
                 'non_field_errors': ["Invalid username or password."]
@@ -77,10 +85,8 @@ class PatientLoginSerializer(serializers.Serializer):
                 'non_field_errors': ["User account is disabled."]
             })
         
-        # Check if user has a patient profile
-        try:
-            patient_profile = user.patient_profile
-        except PatientProfile.DoesNotExist:
+        # Check if user has a patient profile (joined by the auth backend)
+        if not hasattr(user, 'patient_profile'):
             raise serializers.ValidationError({
                 'non_field_errors': ["This account is not associated with a patient profile."]
             })
@@ -176,6 +182,12 @@ class Step2HealthSnapshotSerializer(serializers.ModelSerializer):
             'prescription_upload'
         )
     
+    def validate_prescription_upload(self, value):
+        # Enforce the documented 10MB limit before the file is written to storage
+        if value and value.size > 10 * 1024 * 1024:
+            raise serializers.ValidationError("File size must be less than 10MB.")
+        return value
+    
     def validate(self, attrs):
         # Emergency contact is required
         if not attrs.get('emergency_contact_name') or not attrs.get('emergency_contact_phone'):
@@ -327,8 +339,9 @@ class DoctorPatientTimelineEntryCreateSerializer(serializers.ModelSerializer):
 class DoctorPatientWorkspaceSummarySerializer(serializers.ModelSerializer):
     """Lightweight summary for workspace cards."""
 
-    connection_id = serializers.IntegerField(source='connection.id', read_only=True)
-    doctor_name = serializers.SerializerMethodField()
+    connection_id = serializers.IntegerField(read_only=True)
+    # Annotated by DoctorPatientWorkspace.objects.for_summary()
+    doctor_name = serializers.CharField(read_only=True)
     doctor_id = serializers.CharField(source='doctor.doctor_id', read_only=True)
     patient_name = serializers.CharField(source='patient.full_name', read_only=True)
     patient_id = serializers.CharField(source='patient.patient_id', read_only=True)
@@ -351,13 +364,33 @@ class DoctorPatientWorkspaceSummarySerializer(serializers.ModelSerializer):
             'latest_entry',
         )
 
-    def get_doctor_name(self, obj):
-        return obj.doctor.display_name or obj.doctor.full_name
+    @staticmethod
+    def patient_entries_prefetch():
+        """
+        Prefetch for list querysets so get_latest_entry() needs no query per workspace.
+        The slice becomes a window function, so only the newest patient-visible
+        entry of each workspace is loaded.
+        """
+        return Prefetch(
+            'timeline_entries',
+            queryset=DoctorPatientTimelineEntry.objects.filter(
+                visibility='patient'
+            ).order_by('-created_at')[:1],
+            to_attr='latest_patient_entries'
+        )
+
+    @cached_property
+    def _entry_serializer(self):
+        # With many=True this serializer is the shared child, so every row reuses one entry serializer
+        return DoctorPatientTimelineEntrySerializer()
 
     def get_latest_entry(self, obj):
-        entry = obj.timeline_entries.filter(visibility='patient').first()
+        if hasattr(obj, 'latest_patient_entries'):
+            entry = obj.latest_patient_entries[0] if obj.latest_patient_entries else None
+        else:
+            entry = obj.timeline_entries.filter(visibility='patient').first()
         if entry:
-            return DoctorPatientTimelineEntrySerializer(entry).data
+            return self._entry_serializer.to_representation(entry)
         return None
 
 
@@ -408,7 +441,6 @@ class DoctorPatientWorkspaceDetailSerializer(serializers.ModelSerializer):
 
     def get_patient_profile(self, obj):
         patient = obj.patient
-        from datetime import date
         age = None
         if patient.date_of_birth:
             today = date.today()
@@ -440,9 +472,14 @@ class DoctorPatientWorkspaceDetailSerializer(serializers.ModelSerializer):
 
     def get_intake_forms_summary(self, obj):
         """Get summary of all intake forms for this workspace"""
-        from .models import AIIntakeForm
         forms = AIIntakeForm.objects.filter(
             workspace=obj
+        ).select_related('response').only(
+            # Leaves the schema, raw AI and OCR blobs out of the summary
+            'id', 'title', 'status', 'created_at', 'submitted_at', 'reviewed_at',
+            'ocr_processed', 'ai_analysis', 'response__id'
+        ).annotate(
+            num_uploads=Count('uploads')
         ).order_by('-created_at')
         
         return [{
@@ -452,15 +489,14 @@ class DoctorPatientWorkspaceDetailSerializer(serializers.ModelSerializer):
             'created_at': form.created_at,
             'submitted_at': form.submitted_at,
             'reviewed_at': form.reviewed_at,
-            'has_response': hasattr(form, 'response'),
+            'has_response': getattr(form, 'response', None) is not None,
             'ocr_processed': form.ocr_processed,
             'has_ai_analysis': bool(form.ai_analysis),
-            'uploads_count': form.uploads.count()
+            'uploads_count': form.num_uploads
         } for form in forms]
 
     def get_latest_ocr_analysis(self, obj):
         """Get the latest OCR analysis from submitted intake forms"""
-        from .models import AIIntakeForm
         latest_form = AIIntakeForm.objects.filter(
             workspace=obj,
             status='submitted',
@@ -478,7 +514,6 @@ class DoctorPatientWorkspaceDetailSerializer(serializers.ModelSerializer):
 
     def get_latest_ai_analysis(self, obj):
         """Get the latest AI analysis from submitted intake forms"""
-        from .models import AIIntakeForm
         latest_form = AIIntakeForm.objects.filter(
             workspace=obj,
             status='submitted',
@@ -548,42 +583,54 @@ class PatientProfileForDoctorSerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
     
+    @cached_property
+    def _today(self):
+        # One date per serialization pass (the list child is shared with many=True);
+        # views may pin it with context['today']
+        return self.context.get('today') or date.today()
+    
     def get_age(self, obj):
         if obj.date_of_birth:
-            from datetime import date
-            today = date.today()
+            today = self._today
             return today.year - obj.date_of_birth.year - (
                 (today.month, today.day) < (obj.date_of_birth.month, obj.date_of_birth.day)
             )
         return None
     
+    def _get_connection(self, obj):
+        """
+        The doctor's connection to this patient, or None.
+
+        Views can pass a prebuilt {patient_id: connection} map as
+        context['connections'] (with workspace select_related) so no query runs here.
+        """
+        connections = self.context.get('connections')
+        if connections is not None:
+            return connections.get(obj.id)
+        
+        # Fallback: one query per patient, shared by both fields
+        looked_up = self.__dict__.setdefault('_looked_up_connections', {})
+        if obj.id not in looked_up:
+            looked_up[obj.id] = PatientDoctorConnection.objects.filter(
+                patient=obj,
+                doctor=self.context['doctor_profile']
+            ).select_related('workspace').first()
+        return looked_up[obj.id]
+    
     def get_connection_status(self, obj):
-        doctor_profile = self.context.get('doctor_profile')
-        if doctor_profile:
-            try:
-                connection = PatientDoctorConnection.objects.get(
-                    patient=obj,
-                    doctor=doctor_profile
-                )
-                return connection.status
-            except PatientDoctorConnection.DoesNotExist:
-                return 'not_connected'
-        return None
+        if not self.context.get('doctor_profile'):
+            return None
+        connection = self._get_connection(obj)
+        return connection.status if connection else 'not_connected'
     
     def get_workspace_id(self, obj):
-        doctor_profile = self.context.get('doctor_profile')
-        if doctor_profile:
-            try:
-                connection = PatientDoctorConnection.objects.get(
-                    patient=obj,
-                    doctor=doctor_profile,
-                    status='accepted'
-                )
-                workspace = DoctorPatientWorkspace.objects.filter(connection=connection).first()
-                return workspace.id if workspace else None
-            except PatientDoctorConnection.DoesNotExist:
-                return None
-        return None
+        if not self.context.get('doctor_profile'):
+            return None
+        connection = self._get_connection(obj)
+        if connection is None or connection.status != 'accepted':
+            return None
+        workspace = getattr(connection, 'workspace', None)
+        return workspace.id if workspace else None
 
 
 # ===========================
@@ -609,12 +656,7 @@ class IntakeFormUploadSerializer(serializers.ModelSerializer):
                            'ocr_processed', 'ocr_text', 'ocr_medical_data', 'ocr_confidence')
     
     def get_file_url(self, obj):
-        request = self.context.get('request')
-        if obj.file and hasattr(obj.file, 'url'):
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return absolute_file_url(self.context, obj.file)
 
 
 class IntakeFormResponseSerializer(serializers.ModelSerializer):
@@ -642,6 +684,7 @@ class AIIntakeFormSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'workspace', 'doctor', 'patient', 'doctor_name', 'patient_name',
             'title', 'description', 'doctor_prompt', 'form_schema', 'status',
+            'generation_error',
             'created_at', 'updated_at', 'sent_at', 'submitted_at', 'reviewed_at',
             'ai_summary', 'ai_analysis', 'ocr_processed', 'ocr_results',
             'uploads', 'response', 'has_response'
@@ -649,15 +692,20 @@ class AIIntakeFormSerializer(serializers.ModelSerializer):
         read_only_fields = (
             'id', 'doctor', 'patient', 'created_at', 'updated_at',
             'sent_at', 'submitted_at', 'reviewed_at', 'ai_raw_response',
-            'ai_analysis', 'ocr_processed', 'ocr_results'
+            'generation_error', 'ai_analysis', 'ocr_processed', 'ocr_results'
         )
     
     def get_has_response(self, obj):
-        return hasattr(obj, 'response') and obj.response is not None
+        # Views select_related('response'); a missing row raises an AttributeError subclass
+        return getattr(obj, 'response', None) is not None
 
 
 class AIIntakeFormCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating AI Intake Form with doctor prompt"""
+    # Load the patient with the workspace so building the AI context needs no extra query
+    workspace = serializers.PrimaryKeyRelatedField(
+        queryset=DoctorPatientWorkspace.objects.select_related('patient__user')
+    )
     
     class Meta:
         model = AIIntakeForm
@@ -669,7 +717,7 @@ class AIIntakeFormCreateSerializer(serializers.ModelSerializer):
         """Ensure doctor has access to this workspace"""
         request = self.context.get('request')
         if request and hasattr(request.user, 'doctor_profile'):
-            if value.doctor != request.user.doctor_profile:
+            if value.doctor_id != request.user.doctor_profile.id:
                 raise serializers.ValidationError("You don't have access to this workspace.")
         return value
 
@@ -724,70 +772,11 @@ class IntakeFormResponseCreateUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         # If marking as complete, set completed_at timestamp
         if validated_data.get('is_complete') and not instance.completed_at:
-            from django.utils import timezone
             instance.completed_at = timezone.now()
         
         return super().update(instance, validated_data)
 
 
-class DoctorIntakeFormListSerializer(serializers.ModelSerializer):
-    """Simplified serializer for listing forms (doctor view)"""
-    patient_name = serializers.CharField(source='patient.full_name', read_only=True)
-    patient_id = serializers.CharField(source='patient.patient_id', read_only=True)
-    has_response = serializers.SerializerMethodField()
-    response_status = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = AIIntakeForm
-        fields = (
-            'id', 'title', 'patient_name', 'patient_id', 'status',
-            'created_at', 'sent_at', 'submitted_at', 'has_response', 'response_status'
-        )
-    
-    def get_has_response(self, obj):
-        return hasattr(obj, 'response') and obj.response is not None
-    
-    def get_response_status(self, obj):
-        if hasattr(obj, 'response') and obj.response:
-            return {
-                'is_complete': obj.response.is_complete,
-                'completion_percentage': obj.response.completion_percentage,
-                'last_saved_at': obj.response.last_saved_at
-            }
-        return None
-
-
-class PatientIntakeFormListSerializer(serializers.ModelSerializer):
-    """Simplified serializer for listing forms (patient view)"""
-    doctor_name = serializers.CharField(source='doctor.display_name', read_only=True)
-    doctor_specialization = serializers.CharField(source='doctor.specialization', read_only=True)
-    has_started = serializers.SerializerMethodField()
-    completion_percentage = serializers.SerializerMethodField()
-    workspace_id = serializers.IntegerField(source='workspace.id', read_only=True, allow_null=True)
-    connection_id = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = AIIntakeForm
-        fields = (
-            'id', 'title', 'description', 'doctor_name', 'doctor_specialization',
-            'status', 'sent_at', 'has_started', 'completion_percentage',
-            'workspace_id', 'connection_id'
-        )
-    
-    def get_has_started(self, obj):
-        return hasattr(obj, 'response') and obj.response is not None
-    
-    def get_completion_percentage(self, obj):
-        if hasattr(obj, 'response') and obj.response:
-            return obj.response.completion_percentage
-        return 0
-    
-    def get_connection_id(self, obj):
-        if obj.workspace:
-            return obj.workspace.connection_id
-        return None
-
-
 # ===========================
 # Medical Report Serializers
 # ===========================
@@ -843,12 +832,7 @@ class MedicalReportListSerializer(serializers.ModelSerializer):
         )
     
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return absolute_file_url(self.context, obj.file)
     
     def get_comment_count(self, obj):
         return obj.comments.filter(is_internal=False).count()
@@ -892,12 +876,7 @@ class MedicalReportDetailSerializer(serializers.ModelSerializer):
         )
     
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return absolute_file_url(self.context, obj.file)
     
     def get_comments(self, obj):
         # For patients, exclude internal doctor notes
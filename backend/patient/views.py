@@ -6,8 +6,9 @@ from rest_framework.response import Response
 from django.contrib.auth import login
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from datetime import datetime
 import os
 import json
 import requests
@@ -23,6 +24,7 @@ from .models import (
     DoctorPatientTimelineEntry,
 )
 from doctor.models import DoctorProfile
+from core.google_auth import verify_google_id_token
 from django.utils import timezone
 from .serializers import (
     PatientSignupSerializer,
@@ -60,7 +62,7 @@ def analyze_patient_responses(form_data: Dict, response_data: Dict) -> Dict:
     """Analyze patient's responses and generate insights for the doctor"""
     
     insights = {
-        'analyzed_at': datetime.now().isoformat(),
+        'analyzed_at': timezone.now().isoformat(),
         'overall_summary': '',
         'key_findings': [],
         'symptoms_identified': [],
@@ -379,30 +381,19 @@ def patient_signup(request):
     if serializer.is_valid():
         user = serializer.save()
         
-        # Authenticate the user to set the backend attribute
-        from django.contrib.auth import authenticate
-        authenticated_user = authenticate(
-            request,
-            username=user.username,
-            password=request.data.get('password')
-        )
+        # create_user already hashed the password; log in without hashing it again
+        login(request, user, backend='core.backends.ProfileModelBackend')
         
-        if authenticated_user:
-            # Log the user in (creates session)
-            login(request, authenticated_user)
-            
-            # Get patient profile
-            patient_profile = authenticated_user.patient_profile
-            
-            return Response({
-                'message': 'Patient account created successfully',
-                'user': UserSerializer(authenticated_user).data,
-                'profile': PatientProfileSerializer(patient_profile).data,
-                'profile_completed': patient_profile.profile_completed,
-                'redirect_to': 'profile'  # Patient always redirects to profile page
-            }, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'error': 'Failed to authenticate user'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Cached on the user when the serializer created it
+        patient_profile = user.patient_profile
+        
+        return Response({
+            'message': 'Patient account created successfully',
+            'user': UserSerializer(user).data,
+            'profile': PatientProfileSerializer(patient_profile).data,
+            'profile_completed': patient_profile.profile_completed,
+            'redirect_to': 'profile'  # Patient always redirects to profile page
+        }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -412,34 +403,24 @@ def patient_signup(request):
 @permission_classes([permissions.AllowAny])
 def patient_login(request):
     """Patient login endpoint"""
-    serializer = PatientLoginSerializer(data=request.data)
+    serializer = PatientLoginSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
+        # authenticate() in the serializer already checked the password and set user.backend
         user = serializer.validated_data['user']
         
-        # Authenticate again to ensure backend attribute is set
-        from django.contrib.auth import authenticate
-        authenticated_user = authenticate(
-            request,
-            username=request.data.get('username'),
-            password=request.data.get('password')
-        )
+        # Log the user in (creates session)
+        login(request, user)
         
-        if authenticated_user:
-            # Log the user in (creates session)
-            login(request, authenticated_user)
-            
-            # Get patient profile
-            patient_profile = authenticated_user.patient_profile
-            
-            return Response({
-                'message': 'Login successful',
-                'user': UserSerializer(authenticated_user).data,
-                'profile': PatientProfileSerializer(patient_profile).data,
-                'profile_completed': patient_profile.profile_completed,
-                'redirect_to': 'profile'  # Patient always redirects to profile page
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({'error': 'Authentication failed'}, status=status.HTTP_401_UNAUTHORIZED)
+        # Get patient profile (joined by the auth backend)
+        patient_profile = user.patient_profile
+        
+        return Response({
+            'message': 'Login successful',
+            'user': UserSerializer(user).data,
+            'profile': PatientProfileSerializer(patient_profile).data,
+            'profile_completed': patient_profile.profile_completed,
+            'redirect_to': 'profile'  # Patient always redirects to profile page
+        }, status=status.HTTP_200_OK)
     
     # Return detailed error information
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -508,8 +489,6 @@ def patient_current_user(request):
 @permission_classes([permissions.AllowAny])
 def patient_google_auth(request):
     """Patient Google OAuth authentication"""
-    from google.oauth2 import id_token
-    from google.auth.transport import requests as google_requests
     from django.conf import settings
     
     token = request.data.get('credential')
@@ -521,13 +500,8 @@ def patient_google_auth(request):
         # Get Google Client ID from settings
         google_client_id = settings.GOOGLE_CLIENT_ID
         
-        # Verify the token with Google (with clock skew tolerance)
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            google_requests.Request(),
-            google_client_id,  # Verify with your actual client ID
-            clock_skew_in_seconds=10  # Allow 10 seconds clock skew tolerance
-        )
+        # Verify the token against Google's (cached) certificates, with clock skew tolerance
+        idinfo = verify_google_id_token(token, clock_skew_in_seconds=10)
         
         # Verify the token is for our client ID
         if idinfo['aud'] != google_client_id:
@@ -576,7 +550,7 @@ def patient_google_auth(request):
             )
         
         # Log the user in
-        login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        login(request, user, backend='core.backends.ProfileModelBackend')
         
         return Response({
             'message': 'Google authentication successful',
@@ -603,9 +577,9 @@ def submit_consent(request):
     
     if serializer.is_valid():
         profile.consent_given = True
-        profile.consent_timestamp = datetime.now()
+        profile.consent_timestamp = timezone.now()
         profile.current_step = 1
-        profile.save()
+        profile.save(update_fields=['consent_given', 'consent_timestamp', 'current_step', 'updated_at'])
         
         return Response({
             'message': 'Consent recorded successfully',
@@ -632,7 +606,7 @@ def submit_step1_basic_info(request):
     if serializer.is_valid():
         serializer.save()
         profile.current_step = 2
-        profile.save()
+        profile.save(update_fields=['current_step', 'updated_at'])
         
         return Response({
             'message': 'Step 1 completed successfully',
@@ -659,7 +633,7 @@ def submit_step2_health_snapshot(request):
     if serializer.is_valid():
         serializer.save()
         profile.current_step = 3
-        profile.save()
+        profile.save(update_fields=['current_step', 'updated_at'])
         
         return Response({
             'message': 'Step 2 completed successfully',
@@ -691,7 +665,7 @@ def submit_step3_preferences(request):
             profile.profile_completed = True
         
         profile.current_step = 3
-        profile.save()
+        profile.save(update_fields=['profile_completed', 'current_step', 'updated_at'])
         
         return Response({
             'message': 'Step 3 completed successfully',
@@ -724,7 +698,7 @@ def finish_profile_setup(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     profile.profile_completed = True
-    profile.save()
+    profile.save(update_fields=['profile_completed', 'updated_at'])
     
     return Response({
         'message': 'Profile setup completed successfully',
@@ -825,45 +799,45 @@ def create_connection_request(request):
             'error': 'Cannot connect with unverified doctors'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check if connection already exists
-    existing_connection = PatientDoctorConnection.objects.filter(
-        patient=patient_profile,
-        doctor=doctor_profile
-    ).first()
+    # Create new connection request; unique (patient, doctor) rejects an existing one
+    try:
+        with transaction.atomic():
+            connection = PatientDoctorConnection.objects.create(
+                patient=patient_profile,
+                doctor=doctor_profile,
+                status='pending',
+                initiated_by='patient',
+                patient_note=patient_note
+            )
+    except IntegrityError:
+        existing_connection = PatientDoctorConnection.objects.select_related('patient', 'doctor').get(
+            patient=patient_profile,
+            doctor=doctor_profile
+        )
+    else:
+        return Response({
+            'message': 'Connection request sent successfully',
+            'connection': PatientDoctorConnectionSerializer(connection).data
+        }, status=status.HTTP_201_CREATED)
     
-    if existing_connection:
-        if existing_connection.status == 'accepted':
-            return Response({
-                'error': 'You are already connected with this doctor'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        elif existing_connection.status == 'pending':
-            return Response({
-                'error': 'Connection request already pending'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        elif existing_connection.status == 'rejected':
-            # Allow re-request after rejection
-            existing_connection.status = 'pending'
-            existing_connection.patient_note = patient_note
-            existing_connection.save()
-            
-            return Response({
-                'message': 'Connection request sent successfully',
-                'connection': PatientDoctorConnectionSerializer(existing_connection).data
-            }, status=status.HTTP_200_OK)
+    if existing_connection.status == 'accepted':
+        return Response({
+            'error': 'You are already connected with this doctor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    elif existing_connection.status == 'pending':
+        return Response({
+            'error': 'Connection request already pending'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Create new connection request
-    connection = PatientDoctorConnection.objects.create(
-        patient=patient_profile,
-        doctor=doctor_profile,
-        status='pending',
-        initiated_by='patient',
-        patient_note=patient_note
-    )
+    # Allow re-request after rejection or removal
+    existing_connection.status = 'pending'
+    existing_connection.patient_note = patient_note
+    existing_connection.save()
     
     return Response({
         'message': 'Connection request sent successfully',
-        'connection': PatientDoctorConnectionSerializer(connection).data
-    }, status=status.HTTP_201_CREATED)
+        'connection': PatientDoctorConnectionSerializer(existing_connection).data
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -874,7 +848,7 @@ def get_my_connections(request):
     
     connections = PatientDoctorConnection.objects.filter(
         patient=patient_profile
-    ).select_related('doctor', 'doctor__user')
+    ).select_related('patient', 'doctor')
     
     serializer = PatientDoctorConnectionSerializer(connections, many=True)
     
@@ -893,7 +867,7 @@ def get_connected_doctors(request):
     connections = PatientDoctorConnection.objects.filter(
         patient=patient_profile,
         status='accepted'
-    ).select_related('doctor', 'doctor__user')
+    ).select_related('patient', 'doctor')
     
     serializer = PatientDoctorConnectionSerializer(connections, many=True)
     
@@ -933,7 +907,7 @@ def accept_connection_request(request, connection_id):
     patient_profile = request.user.patient_profile
     
     try:
-        connection = PatientDoctorConnection.objects.get(
+        connection = PatientDoctorConnection.objects.select_related('patient', 'doctor').get(
             id=connection_id,
             patient=patient_profile,
             status='pending'
@@ -964,7 +938,7 @@ def reject_connection_request(request, connection_id):
     patient_profile = request.user.patient_profile
     
     try:
-        connection = PatientDoctorConnection.objects.get(
+        connection = PatientDoctorConnection.objects.select_related('patient', 'doctor').get(
             id=connection_id,
             patient=patient_profile,
             status='pending'
@@ -995,10 +969,11 @@ def list_patient_workspaces(request):
     """List all doctor-specific workspaces for the patient"""
     patient_profile = request.user.patient_profile
 
+    # Only used to ensure workspaces exist, so skip the default ordering
     connections = PatientDoctorConnection.objects.filter(
         patient=patient_profile,
         status='accepted'
-    ).select_related('doctor', 'patient')
+    ).select_related('doctor', 'patient').order_by()
 
     if not connections.exists():
         return Response({'count': 0, 'workspaces': []}, status=status.HTTP_200_OK)
@@ -1009,9 +984,11 @@ def list_patient_workspaces(request):
         workspace.sync_metadata()
         connection_ids.append(connection.id)
 
-    workspaces = DoctorPatientWorkspace.objects.filter(
+    workspaces = DoctorPatientWorkspace.objects.for_summary().filter(
         connection_id__in=connection_ids
-    ).select_related('doctor', 'patient', 'connection').prefetch_related('timeline_entries')
+    ).prefetch_related(
+        DoctorPatientWorkspaceSummarySerializer.patient_entries_prefetch()
+    )
 
     serializer = DoctorPatientWorkspaceSummarySerializer(workspaces, many=True)
     return Response({'count': len(serializer.data), 'workspaces': serializer.data}, status=status.HTTP_200_OK)
@@ -1024,7 +1001,7 @@ def get_patient_workspace_detail(request, connection_id):
     patient_profile = request.user.patient_profile
 
     try:
-        connection = PatientDoctorConnection.objects.select_related('doctor', 'patient').get(
+        connection = PatientDoctorConnection.objects.select_related('doctor', 'patient__user').get(
             id=connection_id,
             patient=patient_profile,
             status='accepted'
@@ -1050,17 +1027,26 @@ def get_patient_workspace_detail(request, connection_id):
 
 # ============= QR CODE SCANNING =============
 
+QR_TOKEN_CACHE_TIMEOUT = 30  # seconds
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def validate_qr_token(request, token):
     """Validate a QR code token before scanning"""
-    try:
-        qr_token = ConnectionToken.objects.select_related('doctor').get(token=token)
-    except ConnectionToken.DoesNotExist:
-        return Response({
-            'error': 'Invalid QR code',
-            'valid': False
-        }, status=status.HTTP_404_NOT_FOUND)
+    # The token (with its doctor) is cached briefly for repeated previews; mark_as_used()
+    # drops the entry and expiry is still checked against the current time on every hit
+    cache_key = ConnectionToken.cache_key(token)
+    qr_token = cache.get(cache_key)
+    if qr_token is None:
+        try:
+            qr_token = ConnectionToken.objects.select_related('doctor').get(token=token)
+        except ConnectionToken.DoesNotExist:
+            return Response({
+                'error': 'Invalid QR code',
+                'valid': False
+            }, status=status.HTTP_404_NOT_FOUND)
+        cache.set(cache_key, qr_token, QR_TOKEN_CACHE_TIMEOUT)
     
     # Check if token is valid
     if not qr_token.is_valid:
@@ -1118,86 +1104,87 @@ def scan_qr_code(request, token):
     
     doctor = qr_token.doctor
     
-    # Check if connection already exists
-    existing_connection = PatientDoctorConnection.objects.filter(
-        patient=patient_profile,
-        doctor=doctor
-    ).first()
+    # Create new instant connection (auto-accepted for QR scans);
+    # unique (patient, doctor) rejects an existing one
+    try:
+        with transaction.atomic():
+            connection = PatientDoctorConnection.objects.create(
+                patient=patient_profile,
+                doctor=doctor,
+                status='accepted',  # Auto-accept for QR code connections
+                accepted_at=timezone.now(),
+                initiated_by='patient',
+                connection_type='qr_code',
+                qr_token=qr_token,
+                patient_note='Connected via QR code'
+            )
+    except IntegrityError:
+        existing_connection = PatientDoctorConnection.objects.select_related('patient', 'doctor').get(
+            patient=patient_profile,
+            doctor=doctor
+        )
+    else:
+        # Mark token as used
+        qr_token.mark_as_used(patient_profile)
+        
+        return Response({
+            'message': 'Successfully connected with doctor via QR code',
+            'connection': PatientDoctorConnectionSerializer(connection).data,
+            'doctor': {
+                'name': doctor.display_name or doctor.full_name,
+                'doctor_id': doctor.doctor_id,
+                'specialization': doctor.specialization,
+                'clinic': doctor.primary_clinic_hospital,
+                'city': doctor.city
+            }
+        }, status=status.HTTP_201_CREATED)
     
-    if existing_connection:
-        if existing_connection.status == 'accepted':
-            return Response({
-                'error': 'You are already connected with this doctor',
-                'connection_exists': True
-            }, status=status.HTTP_400_BAD_REQUEST)
-        elif existing_connection.status == 'pending':
-            # Auto-accept if it's a pending request
-            existing_connection.status = 'accepted'
-            existing_connection.accepted_at = timezone.now()
-            existing_connection.connection_type = 'qr_code'
-            existing_connection.qr_token = qr_token
-            existing_connection.save()
-            
-            # Mark token as used
-            qr_token.mark_as_used(patient_profile)
-            
-            return Response({
-                'message': 'Connection accepted successfully via QR code',
-                'connection': PatientDoctorConnectionSerializer(existing_connection).data,
-                'doctor': {
-                    'name': doctor.display_name or doctor.full_name,
-                    'doctor_id': doctor.doctor_id,
-                    'specialization': doctor.specialization
-                }
-            }, status=status.HTTP_200_OK)
-        elif existing_connection.status in ['rejected', 'removed']:
-            # Update rejected/removed connection to accepted via QR code
-            existing_connection.status = 'accepted'
-            existing_connection.accepted_at = timezone.now()
-            existing_connection.connection_type = 'qr_code'
-            existing_connection.qr_token = qr_token
-            existing_connection.doctor_note = 'Reconnected via QR code'
-            existing_connection.save()
-            
-            # Mark token as used
-            qr_token.mark_as_used(patient_profile)
-            
-            return Response({
-                'message': 'Connection re-established successfully via QR code',
-                'connection': PatientDoctorConnectionSerializer(existing_connection).data,
-                'doctor': {
-                    'name': doctor.display_name or doctor.full_name,
-                    'doctor_id': doctor.doctor_id,
-                    'specialization': doctor.specialization
-                }
-            }, status=status.HTTP_200_OK)
+    if existing_connection.status == 'accepted':
+        return Response({
+            'error': 'You are already connected with this doctor',
+            'connection_exists': True
+        }, status=status.HTTP_400_BAD_REQUEST)
+    elif existing_connection.status == 'pending':
+        # Auto-accept if it's a pending request
+        existing_connection.status = 'accepted'
+        existing_connection.accepted_at = timezone.now()
+        existing_connection.connection_type = 'qr_code'
+        existing_connection.qr_token = qr_token
+        existing_connection.save()
+        
+        # Mark token as used
+        qr_token.mark_as_used(patient_profile)
+        
+        return Response({
+            'message': 'Connection accepted successfully via QR code',
+            'connection': PatientDoctorConnectionSerializer(existing_connection).data,
+            'doctor': {
+                'name': doctor.display_name or doctor.full_name,
+                'doctor_id': doctor.doctor_id,
+                'specialization': doctor.specialization
+            }
+        }, status=status.HTTP_200_OK)
     
-    # Create new instant connection (auto-accepted for QR scans)
-    connection = PatientDoctorConnection.objects.create(
-        patient=patient_profile,
-        doctor=doctor,
-        status='accepted',  # Auto-accept for QR code connections
-        accepted_at=timezone.now(),
-        initiated_by='patient',
-        connection_type='qr_code',
-        qr_token=qr_token,
-        patient_note='Connected via QR code'
-    )
+    # Update rejected/removed connection to accepted via QR code
+    existing_connection.status = 'accepted'
+    existing_connection.accepted_at = timezone.now()
+    existing_connection.connection_type = 'qr_code'
+    existing_connection.qr_token = qr_token
+    existing_connection.doctor_note = 'Reconnected via QR code'
+    existing_connection.save()
     
     # Mark token as used
     qr_token.mark_as_used(patient_profile)
     
     return Response({
-        'message': 'Successfully connected with doctor via QR code',
-        'connection': PatientDoctorConnectionSerializer(connection).data,
+        'message': 'Connection re-established successfully via QR code',
+        'connection': PatientDoctorConnectionSerializer(existing_connection).data,
         'doctor': {
             'name': doctor.display_name or doctor.full_name,
             'doctor_id': doctor.doctor_id,
-            'specialization': doctor.specialization,
-            'clinic': doctor.primary_clinic_hospital,
-            'city': doctor.city
+            'specialization': doctor.specialization
         }
-    }, status=status.HTTP_201_CREATED)
+    }, status=status.HTTP_200_OK)
 
 
 # ===========================
@@ -1205,8 +1192,8 @@ def scan_qr_code(request, token):
 # ===========================
 
 from .models import AIIntakeForm, IntakeFormResponse, IntakeFormUpload, DoctorPatientTimelineEntry
+from .pagination import IntakeFormListPagination
 from .serializers import (
-    PatientIntakeFormListSerializer,
     AIIntakeFormSerializer,
     IntakeFormResponseCreateUpdateSerializer,
     IntakeFormUploadSerializer,
@@ -1218,6 +1205,30 @@ from .serializers import (
 )
 
 
+_PATIENT_INTAKE_LIST_COLUMNS = (
+    'id', 'title', 'description', 'status', 'sent_at', 'workspace_id',
+    'has_response', 'response_completion_percentage',
+    'doctor__display_name', 'doctor__specialization', 'workspace__connection_id',
+)
+
+
+def _patient_intake_list_item(row):
+    """Shape one values() row of the patient's intake form list"""
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'doctor_name': row['doctor__display_name'],
+        'doctor_specialization': row['doctor__specialization'],
+        'status': row['status'],
+        'sent_at': row['sent_at'],
+        'has_started': row['has_response'],
+        'completion_percentage': row['response_completion_percentage'],
+        'workspace_id': row['workspace_id'],
+        'connection_id': row['workspace__connection_id']
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def list_patient_intake_forms(request):
@@ -1236,17 +1247,29 @@ def list_patient_intake_forms(request):
     # Get all forms sent to this patient
     forms = AIIntakeForm.objects.filter(
         patient=patient_profile
-    ).exclude(status='draft').select_related(
-        'doctor', 'workspace'
-    ).prefetch_related('uploads', 'response').order_by('-sent_at')
+    ).exclude(status__in=AIIntakeForm.UNSENT_STATUSES).with_response_state().order_by('-sent_at')
     
     # Filter by status if provided
     form_status = request.query_params.get('status')
     if form_status:
         forms = forms.filter(status=form_status)
     
-    serializer = PatientIntakeFormListSerializer(forms, many=True)
-    return Response({'forms': serializer.data}, status=status.HTTP_200_OK)
+    # Only the listed columns, as plain dicts
+    rows = forms.values(*_PATIENT_INTAKE_LIST_COLUMNS)
+    
+    paginator = IntakeFormListPagination()
+    page = paginator.paginate_queryset(rows, request)
+    if page is not None:
+        return Response({
+            'count': paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'forms': [_patient_intake_list_item(row) for row in page]
+        }, status=status.HTTP_200_OK)
+    
+    # Unpaged: read the rows in chunks
+    forms_data = [_patient_intake_list_item(row) for row in rows.iterator(chunk_size=500)]
+    return Response({'forms': forms_data}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -1265,8 +1288,8 @@ def get_patient_intake_form_detail(request, form_id):
     
     try:
         form = AIIntakeForm.objects.select_related(
-            'doctor', 'patient', 'workspace'
-        ).prefetch_related('uploads', 'response').get(id=form_id)
+            'doctor', 'patient', 'workspace', 'response'
+        ).prefetch_related('uploads').get(id=form_id)
         
         # Verify access
         if form.patient != patient_profile:
@@ -1276,7 +1299,7 @@ def get_patient_intake_form_detail(request, form_id):
             )
         
         # Can't view draft forms
-        if form.status == 'draft':
+        if form.status in AIIntakeForm.UNSENT_STATUSES:
             return Response(
                 {'error': 'This form has not been sent yet'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -1615,7 +1638,7 @@ def patient_dashboard_summary(request):
     recent_activities = DoctorPatientTimelineEntry.objects.filter(
         workspace__patient=patient_profile,
         visibility='patient'
-    ).select_related('workspace__doctor').order_by('-created_at')[:5]
+    ).select_related('workspace__doctor').for_list().order_by('-created_at')[:5]
     
     activities_data = []
     for activity in recent_activities:
@@ -4,6 +4,12 @@ from patient.models import PatientProfile, DoctorPatientWorkspace
 from doctor.models import DoctorProfile
 
 
+class MedicalHistoryEntryQuerySet(models.QuerySet):
+    def with_names(self):
+        """Join everything MedicalHistoryEntrySerializer reads for patient_name and added_by_name"""
+        return self.select_related('patient', 'added_by__doctor_profile', 'added_by__patient_profile')
+
+
 class MedicalHistoryEntry(models.Model):
     """
     Unified medical history entry that aggregates data from multiple sources
@@ -133,6 +139,8 @@ class MedicalHistoryEntry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MedicalHistoryEntryQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-recorded_date', '-created_at']
         verbose_name = 'Medical History Entry'
@@ -1,7 +1,7 @@
 from rest_framework import serializers
+from datetime import date
 from .models import MedicalHistoryEntry, MedicalHistoryTimeline, MedicalHistorySummary
-from patient.models import DoctorPatientWorkspace, PatientProfile
-from doctor.models import DoctorProfile
+from patient.models import DoctorPatientWorkspace
 from django.contrib.auth.models import User
 
 
@@ -31,16 +31,13 @@ class MedicalHistoryEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'recorded_date', 'created_at', 'updated_at']
     
     def get_added_by_name(self, obj):
+        # Reads the reverse profiles that MedicalHistoryEntry.objects.with_names() joins
         if obj.added_by:
-            try:
-                doctor = DoctorProfile.objects.get(user=obj.added_by)
-                return f"Dr. {doctor.full_name}"
-            except DoctorProfile.DoesNotExist:
-                try:
-                    patient = PatientProfile.objects.get(user=obj.added_by)
-                    return patient.full_name
-                except PatientProfile.DoesNotExist:
-                    return obj.added_by.get_full_name() or obj.added_by.username
+            if hasattr(obj.added_by, 'doctor_profile'):
+                return f"Dr. {obj.added_by.doctor_profile.full_name}"
+            if hasattr(obj.added_by, 'patient_profile'):
+                return obj.added_by.patient_profile.full_name
+            return obj.added_by.get_full_name() or obj.added_by.username
         return "System"
 
 
@@ -61,15 +58,11 @@ class MedicalHistoryTimelineSerializer(serializers.ModelSerializer):
     
     def get_performed_by_name(self, obj):
         if obj.performed_by:
-            try:
-                doctor = DoctorProfile.objects.get(user=obj.performed_by)
-                return f"Dr. {doctor.full_name}"
-            except DoctorProfile.DoesNotExist:
-                try:
-                    patient = PatientProfile.objects.get(user=obj.performed_by)
-                    return patient.full_name
-                except PatientProfile.DoesNotExist:
-                    return obj.performed_by.get_full_name() or obj.performed_by.username
+            if hasattr(obj.performed_by, 'doctor_profile'):
+                return f"Dr. {obj.performed_by.doctor_profile.full_name}"
+            if hasattr(obj.performed_by, 'patient_profile'):
+                return obj.performed_by.patient_profile.full_name
+            return obj.performed_by.get_full_name() or obj.performed_by.username
         return "System"
 
 
@@ -299,7 +292,6 @@ class EnhancedMedicalHistorySummarySerializer(serializers.ModelSerializer):
     
     def get_patient_age(self, obj):
         if obj.patient.date_of_birth:
-            from datetime import date
             today = date.today()
             age = today.year - obj.patient.date_of_birth.year - (
                 (today.month, today.day) < (obj.patient.date_of_birth.month, obj.patient.date_of_birth.day)
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q, Count, Case, When, IntegerField
+from django.utils import timezone
 from datetime import datetime, date, timedelta
 import json
 import os
@@ -46,7 +47,7 @@ def doctor_get_workspace_history(request, workspace_id):
         )
         
         # Get all history entries
-        entries = MedicalHistoryEntry.objects.filter(workspace=workspace)
+        entries = MedicalHistoryEntry.objects.with_names().filter(workspace=workspace)
         
         # Apply filters
         category = request.GET.get('category')
@@ -125,7 +126,7 @@ def doctor_get_history_summary(request, workspace_id):
         )
         
         # Refresh if older than 1 hour
-        if created or (datetime.now() - summary.last_updated.replace(tzinfo=None)).seconds > 3600:
+        if created or (timezone.now() - summary.last_updated).seconds > 3600:
             summary.refresh_summary()
         
         serializer = MedicalHistorySummarySerializer(summary)
@@ -165,7 +166,7 @@ def doctor_get_history_by_category(request, workspace_id, category):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        entries = MedicalHistoryEntry.objects.filter(
+        entries = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category=category
         )
@@ -355,7 +356,7 @@ def doctor_verify_entry(request, entry_id):
             )
         
         entry.verified_by_doctor = True
-        entry.verified_at = datetime.now()
+        entry.verified_at = timezone.now()
         entry.save()
         
         # Create timeline event
@@ -448,7 +449,9 @@ def doctor_get_entry_timeline(request, entry_id):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        timeline = MedicalHistoryTimeline.objects.filter(history_entry=entry)
+        timeline = MedicalHistoryTimeline.objects.filter(history_entry=entry).select_related(
+            'performed_by__doctor_profile', 'performed_by__patient_profile'
+        )
         serializer = MedicalHistoryTimelineSerializer(timeline, many=True)
         
         return Response({
@@ -484,28 +487,28 @@ def doctor_get_clinical_summary(request, workspace_id):
         )
         
         # Active conditions
-        active_conditions = MedicalHistoryEntry.objects.filter(
+        active_conditions = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='condition',
             status='active'
         ).order_by('-is_chronic', '-is_critical', '-severity')
         
         # Current medications
-        current_medications = MedicalHistoryEntry.objects.filter(
+        current_medications = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='medication',
             status='active'
         ).order_by('-is_critical', 'title')
         
         # All allergies (always important)
-        allergies = MedicalHistoryEntry.objects.filter(
+        allergies = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='allergy'
         ).order_by('-is_critical', 'title')
         
         # Recent surgeries (last 2 years)
         two_years_ago = date.today() - timedelta(days=730)
-        recent_surgeries = MedicalHistoryEntry.objects.filter(
+        recent_surgeries = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='surgery',
             start_date__gte=two_years_ago
@@ -513,7 +516,7 @@ def doctor_get_clinical_summary(request, workspace_id):
         
         # Recent visits (last 6 months)
         six_months_ago = date.today() - timedelta(days=180)
-        recent_visits = MedicalHistoryEntry.objects.filter(
+        recent_visits = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='visit',
             start_date__gte=six_months_ago
@@ -521,14 +524,14 @@ def doctor_get_clinical_summary(request, workspace_id):
         
         # Recent lab results (last 3 months)
         three_months_ago = date.today() - timedelta(days=90)
-        recent_labs = MedicalHistoryEntry.objects.filter(
+        recent_labs = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category='lab_result',
             start_date__gte=three_months_ago
         ).order_by('-start_date')
         
         # Items requiring monitoring
-        monitoring_items = MedicalHistoryEntry.objects.filter(
+        monitoring_items = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             requires_monitoring=True,
             status='active'
@@ -658,7 +661,7 @@ def patient_get_my_history(request):
     """Patient views their complete medical history"""
     try:
         patient_profile = PatientProfile.objects.get(user=request.user)
-        entries = MedicalHistoryEntry.objects.filter(patient=patient_profile)
+        entries = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile)
         
         if request.GET.get('category'):
             entries = entries.filter(category=request.GET.get('category'))
@@ -718,7 +721,7 @@ def patient_get_history_by_category(request, category):
         if category not in valid_categories:
             return Response({'error': f'Invalid category. Valid: {", ".join(valid_categories)}'}, status=status.HTTP_400_BAD_REQUEST)
         
-        entries = MedicalHistoryEntry.objects.filter(patient=patient_profile, category=category)
+        entries = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category=category)
         if request.GET.get('status'):
             entries = entries.filter(status=request.GET.get('status'))
         
@@ -859,7 +862,9 @@ def patient_get_entry_timeline(request, entry_id):
     try:
         patient_profile = PatientProfile.objects.get(user=request.user)
         entry = MedicalHistoryEntry.objects.get(id=entry_id, patient=patient_profile)
-        timeline = MedicalHistoryTimeline.objects.filter(history_entry=entry)
+        timeline = MedicalHistoryTimeline.objects.filter(history_entry=entry).select_related(
+            'performed_by__doctor_profile', 'performed_by__patient_profile'
+        )
         serializer = MedicalHistoryTimelineSerializer(timeline, many=True)
         return Response({'entry_id': entry_id, 'entry_title': entry.title, 'timeline': serializer.data})
     except PatientProfile.DoesNotExist:
@@ -877,13 +882,13 @@ def patient_get_dashboard_view(request):
         six_months_ago = date.today() - timedelta(days=180)
         three_months_ago = date.today() - timedelta(days=90)
         
-        active_conditions = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='condition', status='active').order_by('-is_chronic', '-severity')
-        current_medications = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='medication', status='active').order_by('title')
-        allergies = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='allergy').order_by('-is_critical', 'title')
-        recent_visits = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='visit', start_date__gte=six_months_ago).order_by('-start_date')
-        recent_labs = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='lab_result', start_date__gte=three_months_ago).order_by('-start_date')
-        surgeries = MedicalHistoryEntry.objects.filter(patient=patient_profile, category='surgery').order_by('-start_date')
-        monitoring_items = MedicalHistoryEntry.objects.filter(patient=patient_profile, requires_monitoring=True, status='active').order_by('-is_critical', 'category')
+        active_conditions = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='condition', status='active').order_by('-is_chronic', '-severity')
+        current_medications = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='medication', status='active').order_by('title')
+        allergies = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='allergy').order_by('-is_critical', 'title')
+        recent_visits = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='visit', start_date__gte=six_months_ago).order_by('-start_date')
+        recent_labs = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='lab_result', start_date__gte=three_months_ago).order_by('-start_date')
+        surgeries = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, category='surgery').order_by('-start_date')
+        monitoring_items = MedicalHistoryEntry.objects.with_names().filter(patient=patient_profile, requires_monitoring=True, status='active').order_by('-is_critical', 'category')
         
         return Response({
             'patient_name': patient_profile.full_name,
@@ -2114,7 +2119,7 @@ def clinical_summary_view(request, workspace_id):
         needs_refresh = (
             not summary.ai_clinical_summary or
             not summary.ai_last_generated or
-            (datetime.now() - summary.ai_last_generated.replace(tzinfo=None)).days >= 1
+            (timezone.now() - summary.ai_last_generated).days >= 1
         )
         
         force_refresh = request.GET.get('force_refresh') == 'true'
@@ -2341,7 +2346,7 @@ def category_detailed_view(request, workspace_id, category):
                 'error': f'Invalid category. Valid: {", ".join(valid_categories)}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        entries = MedicalHistoryEntry.objects.filter(
+        entries = MedicalHistoryEntry.objects.with_names().filter(
             workspace=workspace,
             category=category
         ).order_by('-recorded_date')
@@ -4,40 +4,51 @@ import { CheckCircle, XCircle, Loader2, FileText, Shield, RefreshCcw } from 'luc
 import api from '../../services/api';
 import { useAuth } from '../../contexts/AuthContext';
 
+// Matches the backend's default page size for the admin doctor lists
+const DOCTORS_PAGE_SIZE = 50;
+
 export default function DoctorVerification() {
   const { logout } = useAuth();
   const navigate = useNavigate();
 
-  const [pendingDoctors, setPendingDoctors] = useState([]);
-  const [allDoctors, setAllDoctors] = useState([]);
+  const [doctors, setDoctors] = useState([]);
+  const [totalCount, setTotalCount] = useState(0);
+  const [hasMore, setHasMore] = useState(false);
   const [selectedDoctorId, setSelectedDoctorId] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [actionLoading, setActionLoading] = useState(false);
   const [error, setError] = useState('');
   const [statusFilter, setStatusFilter] = useState('pending');
   const [rejectReason, setRejectReason] = useState('');
 
   const selectedDoctor = useMemo(() => {
-    const combined = [...pendingDoctors, ...allDoctors];
-    return combined.find((doc) => doc.id === selectedDoctorId) || combined[0] || null;
-  }, [pendingDoctors, allDoctors, selectedDoctorId]);
+    return doctors.find((doc) => doc.id === selectedDoctorId) || doctors[0] || null;
+  }, [doctors, selectedDoctorId]);
 
   useEffect(() => {
     loadDoctors();
-  }, []);
+  }, [statusFilter]);
+
+  // The lists are paged on the server; the status filter is applied there too
+  const fetchDoctorsPage = (offset) => {
+    const page = { limit: DOCTORS_PAGE_SIZE, offset };
+    if (statusFilter === 'pending') {
+      return api.admin.getPendingDoctors(page);
+    }
+    return api.admin.getAllDoctors(statusFilter === 'all' ? undefined : statusFilter, page);
+  };
 
   const loadDoctors = async () => {
     try {
       setLoading(true);
       setError('');
-      const [pendingRes, allRes] = await Promise.all([
-        api.admin.getPendingDoctors(),
-        api.admin.getAllDoctors(),
-      ]);
-      setPendingDoctors(pendingRes.doctors || []);
-      setAllDoctors(allRes.doctors || []);
-      const firstDoctor = pendingRes.doctors?.[0] || allRes.doctors?.[0] || null;
-      setSelectedDoctorId(firstDoctor ? firstDoctor.id : null);
+      const res = await fetchDoctorsPage(0);
+      const firstPage = res.doctors || [];
+      setDoctors(firstPage);
+      setTotalCount(res.count ?? firstPage.length);
+      setHasMore(Boolean(res.next));
+      setSelectedDoctorId(firstPage[0] ? firstPage[0].id : null);
     } catch (err) {
       setError(err.response?.data?.error || 'Failed to load doctor requests.');
     } finally {
@@ -45,15 +56,20 @@ export default function DoctorVerification() {
     }
   };
 
-  const filteredDoctors = useMemo(() => {
-    if (statusFilter === 'pending') {
-      return pendingDoctors;
-    }
-    if (statusFilter === 'all') {
-      return allDoctors;
+  const loadMoreDoctors = async () => {
+    try {
+      setLoadingMore(true);
+      setError('');
+      const res = await fetchDoctorsPage(doctors.length);
+      setDoctors((prev) => [...prev, ...(res.doctors || [])]);
+      setTotalCount(res.count ?? totalCount);
+      setHasMore(Boolean(res.next));
+    } catch (err) {
+      setError(err.response?.data?.error || 'Failed to load more doctors.');
+    } finally {
+      setLoadingMore(false);
     }
-    return allDoctors.filter((doc) => doc.profile_status === statusFilter);
-  }, [pendingDoctors, allDoctors, statusFilter]);
+  };
 
   const handleApprove = async () => {
     if (!selectedDoctor) return;
@@ -158,12 +174,12 @@ export default function DoctorVerification() {
               </div>
 
               <div className="space-y-3 max-h-[70vh] overflow-y-auto pr-2">
-                {filteredDoctors.length === 0 && (
+                {doctors.length === 0 && (
                   <p className="text-sm text-gray-500 text-center py-6">
                     No doctors found for this filter.
                   </p>
                 )}
-                {filteredDoctors.map((doctor) => (
+                {doctors.map((doctor) => (
                   <button
                     key={doctor.id}
                     onClick={() => setSelectedDoctorId(doctor.id)}
@@ -183,6 +199,23 @@ export default function DoctorVerification() {
                     </p>
                   </button>
                 ))}
+                {doctors.length > 0 && (
+                  <div className="pt-2 text-center space-y-2">
+                    <p className="text-xs text-gray-500">
+                      Showing {doctors.length} of {totalCount}
+                    </p>
+                    {hasMore && (
+                      <button
+                        onClick={loadMoreDoctors}
+                        disabled={loadingMore}
+                        className="w-full px-4 py-2 bg-white border border-gray-300 rounded-lg text-sm text-gray-700 hover:bg-gray-50 disabled:opacity-60 flex items-center justify-center gap-2"
+                      >
+                        {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                        Load more
+                      </button>
+                    )}
+                  </div>
+                )}
               </div>
             </div>
 
@@ -369,7 +369,27 @@ const api = {
         title,
         description,
       });
-      return response.data;
+
+      // Template matches are ready immediately (201)
+      const formId = response.data.form_id;
+      if (response.data.status !== 'generating') {
+        return api.doctor.getIntakeFormDetail(formId);
+      }
+
+      // Generation runs in the background (202); poll until the form is ready
+      for (let attempt = 0; attempt < 120; attempt++) {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        const form = await api.doctor.getIntakeFormDetail(formId);
+        if (form.status === 'failed') {
+          const error = new Error(form.generation_error || 'Failed to generate form');
+          error.response = { data: { error: form.generation_error } };
+          throw error;
+        }
+        if (form.status !== 'generating') {
+          return form;
+        }
+      }
+      throw new Error('Timed out waiting for the intake form to be generated');
     },
 
     getIntakeForms: async (workspaceId = null, status = null) => {
@@ -570,16 +590,23 @@ const api = {
       return response.data;
     },
 
-    getPendingDoctors: async () => {
+    // Both doctor lists are paged: pass { limit, offset } and follow `count`/`next`
+    getPendingDoctors: async ({ limit, offset } = {}) => {
       await api.core.getCsrfToken();
-      const response = await apiClient.get('/admin/doctors/pending/');
+      const params = {};
+      if (limit) params.limit = limit;
+      if (offset) params.offset = offset;
+      const response = await apiClient.get('/admin/doctors/pending/', { params });
       return response.data;
     },
 
-    getAllDoctors: async (status) => {
+    getAllDoctors: async (status, { limit, offset } = {}) => {
       await api.core.getCsrfToken();
-      const query = status ? `?status=${status}` : '';
-      const response = await apiClient.get(`/admin/doctors/all/${query}`);
+      const params = {};
+      if (status) params.status = status;
+      if (limit) params.limit = limit;
+      if (offset) params.offset = offset;
+      const response = await apiClient.get('/admin/doctors/all/', { params });
       return response.data;
     },
 